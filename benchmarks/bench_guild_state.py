@@ -0,0 +1,65 @@
+"""Memory footprint of per-guild state: the old string-keyed dicts vs GuildStateRegistry.
+
+Usage: python benchmarks/bench_guild_state.py"""
+import os
+import sys
+import tracemalloc
+from datetime import date
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from guild_state import GuildStateRegistry  # noqa: E402
+
+SIZES = (1_000, 10_000, 100_000)
+BASE_ID = 1388945401519935549
+
+
+def build_legacy(n):
+    """The six module-level dicts bot.py used to keep"""
+    dicts = {name: {} for name in ('morning_channels', 'morning_messages', 'welcome_channels',
+                                   'welcome_messages', 'bump_command_id_cache')}
+    morning_sent_today = set()
+    for i in range(n):
+        guild_id = BASE_ID + i
+        key = str(guild_id)
+        dicts['morning_channels'][key] = guild_id + 1
+        dicts['morning_messages'][key] = 'Good morning!'
+        dicts['welcome_channels'][key] = guild_id + 2
+        dicts['welcome_messages'][key] = 'Welcome {member}!'
+        dicts['bump_command_id_cache'][guild_id] = '947088344167366700'
+        morning_sent_today.add(key)
+    return dicts, morning_sent_today
+
+
+def build_registry(n):
+    registry = GuildStateRegistry()
+    today = date.today()
+    for i in range(n):
+        guild_id = BASE_ID + i
+        state = registry.ensure(guild_id)
+        state.morning_channel_id = guild_id + 1
+        state.morning_message = 'Good morning!'
+        state.welcome_channel_id = guild_id + 2
+        state.welcome_message = 'Welcome {member}!'
+        state.bump_command_id = '947088344167366700'
+        state.morning_sent_on = today
+    return registry
+
+
+def measure(builder, n):
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    result = builder(n)
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    size = sum(stat.size_diff for stat in after.compare_to(before, 'filename'))
+    del result
+    return size / n
+
+
+if __name__ == '__main__':
+    print(f"{'guilds':>8} {'legacy B/guild':>15} {'registry B/guild':>17} {'saving':>7}")
+    for n in SIZES:
+        legacy = measure(build_legacy, n)
+        registry = measure(build_registry, n)
+        print(f"{n:>8} {legacy:>15.0f} {registry:>17.0f} {1 - registry / legacy:>7.0%}")
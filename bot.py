@@ -1,13 +1,48 @@
+import time
+STARTUP_STARTED = time.monotonic()
+
 import discord
 from discord.ext import commands, tasks
 import asyncio
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
 from collections import defaultdict
 import json
 import os
-import webserver
-import aiohttp
-import pytz
+import sys
+import shlex
+import signal
+import threading
+from typing import Optional
+from moderation import ModerationExecutor
+from guild_state import GuildStateRegistry, parse_settings
+from structure import StructureTracker, restore_guild
+from purge import PurgeFilter, purge_channel
+from broadcast import broadcast, resolve_text_channel
+from settings_watcher import SettingsWatcher, write_json_atomic
+from logging_setup import get_logger, setup_logging
+from modlog import ModLog
+from raid_detector import RaidDetector, sparkline
+from pagination import Paginator, SortedIndex, add_long_field
+from durations import parse_duration
+from startup import StartupTimer
+import memory_profile
+import snapshot
+import rest_profiler
+
+# webserver (Flask) and aiohttp are imported where they are first used, so they
+# don't sit on the path between process start and the gateway connecting
+startup_timer = StartupTimer(STARTUP_STARTED)
+startup_timer.since_start('imports')
+
+# Per-subsystem loggers (records are queued and written by a background thread)
+log = get_logger('core')
+antinuke_log = get_logger('antinuke')
+antiraid_log = get_logger('antiraid')
+welcome_log = get_logger('welcome')
+morning_log = get_logger('morning')
+bump_log = get_logger('bump')
+commands_log = get_logger('commands')
 
 # Bot configuration
 intents = discord.Intents.default()
@@ -15,74 +50,189 @@ intents.message_content = True
 intents.members = True
 intents.guilds = True
 
-bot = commands.Bot(command_prefix='!', intents=intents)
+# Member/message caching and startup chunking come from BOT_MEMORY_PROFILE (see memory_profile.py)
+MEMORY_PROFILE = memory_profile.profile_name()
+bot = commands.Bot(command_prefix='!', intents=intents, **memory_profile.bot_options(intents, MEMORY_PROFILE),
+                   http_trace=rest_profiler.profiler.trace_config())
+# With REST_PROFILE=1, time every REST call per route and per causing event/command/task
+rest_profiler.profiler.install(bot)
+
+# `python bot.py --measure-startup` reports startup time and RSS, then exits
+MEASURE_STARTUP = '--measure-startup' in sys.argv
 
 # Data storage
 channel_deletion_times = defaultdict(list)  # {user_id: [timestamps]}
-member_joins = defaultdict(list)  # {guild_id: [timestamps]}
+raid_detector = RaidDetector()  # per-guild join-rate baselines
 custom_commands = {}  # {command_name: response}
-morning_channels = {}  # {guild_id: channel_id}
-morning_messages = {}  # {guild_id: custom_message}
-welcome_channels = {}  # {guild_id: channel_id}
-welcome_messages = {}  # {guild_id: custom_message}
+guild_states = GuildStateRegistry()  # morning/welcome settings and runtime state per guild
+
+# Welcome channel used when neither the guild nor the settings file names one
+DEFAULT_WELCOME_CHANNEL_ID = 1388945402333761698
+DEFAULT_MORNING_MESSAGE = "🌅 Good morning everyone! Have a great day! 🌅"
+
+# Channel/role layout per guild, kept current from gateway events for !restore
+structure_tracker = StructureTracker()
+
+# Deduplicates and batches timeouts/warnings/deletes triggered by spam
+moderation = ModerationExecutor()
+
+# Append-only audit trail of every moderation action, queried by !modlog
+modlog = ModLog(os.getenv('MODLOG_DB', 'modlog.db'))
+
+def log_moderation_result(result):
+    if result.status == 'ok':
+        modlog.record(result.guild_id, result.action, user_id=result.user_id,
+                      moderator_id=bot.user.id if bot.user else None, reason=result.reason)
+
+moderation.listeners.append(log_moderation_result)
+
+# Sorted key indexes behind the paginated listings (rebuilt lazily after a change)
+command_index = SortedIndex(lambda: custom_commands)
+morning_index = SortedIndex(lambda: [
+    *(str(state.guild_id) for state in guild_states.guilds.values() if state.morning_channel_id is not None),
+    *guild_states.morning_targets,
+])
+welcome_index = SortedIndex(lambda: [
+    *(str(state.guild_id) for state in guild_states.guilds.values()
+      if state.welcome_channel_id is not None or state.welcome_message is not None),
+    *guild_states.welcome_targets,
+])
 
 # Load custom commands from file
 COMMANDS_FILE = 'custom_commands.json'
 MORNING_FILE = 'morning_settings.json'
 
+# Picks up out-of-band edits to the settings files without a restart
+settings_watcher = SettingsWatcher()
+SETTINGS_POLL_SECONDS = 2
+
 def load_commands():
-    global custom_commands
     if os.path.exists(COMMANDS_FILE):
         with open(COMMANDS_FILE, 'r') as f:
-            custom_commands = json.load(f)
+            apply_commands(parse_commands(json.load(f)))
+
+def parse_commands(data):
+    """Validate a custom commands file (runs in the settings watcher's worker thread)"""
+    if not isinstance(data, dict) or not all(isinstance(k, str) and isinstance(v, str) for k, v in data.items()):
+        raise ValueError("custom commands must map command names to response text")
+    return data
+
+def apply_commands(data):
+    global custom_commands
+    custom_commands = data
+    command_index.invalidate()
 
 def save_commands():
-    with open(COMMANDS_FILE, 'w') as f:
-        json.dump(custom_commands, f, indent=4)
+    write_json_atomic(COMMANDS_FILE, custom_commands)
+    settings_watcher.remember(COMMANDS_FILE)
 
 def load_morning_settings():
-    global morning_channels, morning_messages, welcome_channels, welcome_messages
     if os.path.exists(MORNING_FILE):
         with open(MORNING_FILE, 'r') as f:
-            data = json.load(f)
-            morning_channels = data.get('channels', {})
-            morning_messages = data.get('messages', {})
-            welcome_channels = data.get('welcome_channels', {})
-            welcome_messages = data.get('welcome_messages', {})
+            apply_morning_settings(parse_settings(json.load(f)))
+
+def apply_morning_settings(parsed):
+    """Swap in settings built by parse_settings()"""
+    guild_states.apply_settings(parsed)
+    morning_index.invalidate()
+    welcome_index.invalidate()
 
 def save_morning_settings():
-    with open(MORNING_FILE, 'w') as f:
-        json.dump({
-            'channels': morning_channels,
-            'messages': morning_messages,
-            'welcome_channels': welcome_channels,
-            'welcome_messages': welcome_messages
-        }, f, indent=4)
+    write_json_atomic(MORNING_FILE, guild_states.to_settings())
+    settings_watcher.remember(MORNING_FILE)
+    morning_index.invalidate()
+    welcome_index.invalidate()
+
+def load_settings():
+    """Load every settings file (runs in a worker thread during gateway login)"""
+    with startup_timer.phase('settings'):
+        load_commands()
+        load_morning_settings()
+    with startup_timer.phase('snapshot'):
+        restore_snapshot()
+
+# Volatile state (dedupe, join/deletion windows, morning sent dates, bump command
+# IDs) is snapshotted periodically and on shutdown, so a restart resumes warm
+SNAPSHOT_FILE = os.getenv('SNAPSHOT_FILE', 'runtime_state.snapshot')
+SNAPSHOT_INTERVAL = 60
+SNAPSHOT_MAX_AGE = 6 * 60 * 60  # older snapshots are ignored entirely
+CHANNEL_DELETION_WINDOW = timedelta(seconds=60)
+
+def collect_snapshot():
+    """Snapshot sections for every subsystem (runs on the event loop, cheap copies only)"""
+    epoch = datetime(1970, 1, 1)
+    return {
+        'guild_states': guild_states.runtime_snapshot(),
+        'raid_detector': raid_detector.snapshot(),
+        'moderation': moderation.dedupe_snapshot(),
+        'channel_deletions': {
+            str(user_id): [(t - epoch).total_seconds() for t in times]
+            for user_id, times in channel_deletion_times.items() if times
+        },
+    }
+
+def restore_snapshot():
+    """Load the last snapshot, if it is recent enough (call after the settings files)"""
+    sections = snapshot.load_snapshot(SNAPSHOT_FILE, SNAPSHOT_MAX_AGE)
+    if sections is None:
+        return
+    try:
+        guild_states.restore_runtime(sections.get('guild_states', {}))
+        raid_detector.restore(sections.get('raid_detector', {}))
+        moderation.restore_dedupe(sections.get('moderation', []))
+        cutoff = datetime.utcnow() - CHANNEL_DELETION_WINDOW
+        for user_id, stamps in sections.get('channel_deletions', {}).items():
+            times = [datetime(1970, 1, 1) + timedelta(seconds=ts) for ts in stamps]
+            times = [t for t in times if t >= cutoff]
+            if times:
+                channel_deletion_times[int(user_id)] = times
+    except (KeyError, TypeError, ValueError):
+        log.exception("Snapshot %s has an unexpected layout, starting cold", SNAPSHOT_FILE)
+
+async def save_snapshot():
+    """Write a snapshot now (compression and file I/O happen in a worker thread)"""
+    sections = collect_snapshot()
+    size = await asyncio.to_thread(snapshot.save_snapshot, SNAPSHOT_FILE, sections)
+    log.debug("Saved snapshot (%d bytes)", size)
 
-load_commands()
-load_morning_settings()
+def watch_settings():
+    """Start tracking the settings files as they are now (call after load_settings)"""
+    settings_watcher.watch(COMMANDS_FILE, lambda: dict(custom_commands), apply_commands, parse=parse_commands)
+    settings_watcher.watch(MORNING_FILE, guild_states.to_settings, apply_morning_settings, parse=parse_settings)
 
 @bot.event
 async def on_ready():
-    print(f'{bot.user} has logged in!')
-    print(f'Bot is in {len(bot.guilds)} guilds')
+    log.info("%s has logged in! Bot is in %d guilds", bot.user, len(bot.guilds))
+    if not startup_timer.reported:
+        startup_timer.reported = True
+        startup_timer.since_start('ready')
+        log.info(startup_timer.report(), extra={'phases': startup_timer.phases})
+    if MEASURE_STARTUP:
+        print(memory_profile.startup_report(bot, MEMORY_PROFILE, startup_timer.elapsed()))
+        await bot.close()
+        return
+    # Start background tasks first; they wait for readiness on their own
+    # (started through the profiler so their REST calls are attributed to the task)
+    for loop in (morning_message_task, bump_task, settings_watch_task, snapshot_task):
+        if not loop.is_running():
+            rest_profiler.start_loop(loop)
     await bot.change_presence(activity=discord.Game(name="Protecting your server!"))
-    # Start the morning message task
-    if not morning_message_task.is_running():
-        morning_message_task.start()
-    # Start the bump task
-    if not bump_task.is_running():
-        bump_task.start()
 
 # Anti-Nuke: Track channel deletions
 @bot.event
 async def on_guild_channel_delete(channel):
     guild = channel.guild
+    structure_tracker.channel_deleted(channel)
     # Try to get the audit log to find who deleted the channel
     try:
         async for entry in guild.audit_logs(limit=1, action=discord.AuditLogAction.channel_delete):
             user = entry.user
             if user and user != bot.user:
+                # Members may not be cached in low-memory profiles, so resolve lazily
+                if not isinstance(user, discord.Member):
+                    user = await memory_profile.get_or_fetch_member(guild, user.id)
+                    if user is None:
+                        continue
                 # Check if user is an admin
                 if user.guild_permissions.administrator:
                     current_time = datetime.utcnow()
@@ -94,14 +244,17 @@ async def on_guild_channel_delete(channel):
                     # Remove deletions older than 60 seconds
                     channel_deletion_times[user_id] = [
                         t for t in channel_deletion_times[user_id]
-                        if current_time - t <= timedelta(seconds=60)
+                        if current_time - t <= CHANNEL_DELETION_WINDOW
                     ]
                     
                     # If 2 or more deletions within 60 seconds, ban the admin
                     if len(channel_deletion_times[user_id]) >= 2:
                         try:
                             await guild.ban(user, reason="Anti-nuke: Deleted 2+ channels within 60 seconds")
-                            print(f"Banned {user} ({user_id}) for deleting 2+ channels within 60 seconds")
+                            modlog.record(guild.id, 'ban', user_id=user_id, moderator_id=bot.user.id,
+                                          reason="Anti-nuke: Deleted 2+ channels within 60 seconds")
+                            antinuke_log.warning("Banned %s (%s) for deleting 2+ channels within 60 seconds", user, user_id,
+                                                 extra={'guild_id': guild.id, 'user_id': user_id})
                             
                             # Send alert to a log channel (if exists)
                             log_channel = discord.utils.get(guild.text_channels, name='mod-log')
@@ -117,37 +270,66 @@ async def on_guild_channel_delete(channel):
                                 )
                                 embed.add_field(name="User", value=f"{user} ({user_id})", inline=False)
                                 embed.add_field(name="Channels Deleted", value=len(channel_deletion_times[user_id]), inline=False)
+                                embed.add_field(name="Recovery", value="Use `!restore` to recreate the deleted channels.", inline=False)
                                 await log_channel.send(embed=embed)
                             
                             # Clear the tracking for this user
                             channel_deletion_times[user_id] = []
                         except discord.Forbidden:
-                            print(f"Could not ban {user} - insufficient permissions")
-                        except Exception as e:
-                            print(f"Error banning {user}: {e}")
+                            antinuke_log.error("Could not ban %s - insufficient permissions", user, extra={'guild_id': guild.id})
+                        except Exception:
+                            antinuke_log.exception("Error banning %s", user, extra={'guild_id': guild.id})
     except discord.Forbidden:
-        print("No permission to view audit logs")
-    except Exception as e:
-        print(f"Error checking audit logs: {e}")
+        antinuke_log.error("No permission to view audit logs", extra={'guild_id': guild.id})
+    except Exception:
+        antinuke_log.exception("Error checking audit logs", extra={'guild_id': guild.id})
+
+# Anti-Nuke: Keep the channel/role snapshot current (no REST calls needed)
+@bot.event
+async def on_guild_available(guild):
+    structure_tracker.sync_guild(guild)
+
+@bot.event
+async def on_guild_join(guild):
+    structure_tracker.sync_guild(guild)
+
+@bot.event
+async def on_guild_remove(guild):
+    structure_tracker.forget_guild(guild.id)
+    raid_detector.forget_guild(guild.id)
+
+@bot.event
+async def on_guild_channel_create(channel):
+    structure_tracker.channel_changed(channel)
+
+@bot.event
+async def on_guild_channel_update(before, after):
+    structure_tracker.channel_changed(after)
+
+@bot.event
+async def on_guild_role_create(role):
+    structure_tracker.role_changed(role)
+
+@bot.event
+async def on_guild_role_update(before, after):
+    structure_tracker.role_changed(after)
+
+@bot.event
+async def on_guild_role_delete(role):
+    structure_tracker.role_deleted(role)
 
 # Anti-Raid: Track member joins
 @bot.event
 async def on_member_join(member):
     guild = member.guild
-    current_time = datetime.utcnow()
     
-    # Add join time
-    member_joins[guild.id].append(current_time)
-    
-    # Remove joins older than 10 seconds
-    member_joins[guild.id] = [
-        t for t in member_joins[guild.id]
-        if current_time - t <= timedelta(seconds=10)
-    ]
-    
-    # If 5 or more joins within 10 seconds, it might be a raid
-    if len(member_joins[guild.id]) >= 5:
-        # Lock down the server temporarily
+    # Compare this minute's joins against the server's own baseline
+    alert = raid_detector.record_join(guild.id)
+    if alert:
+        summary = (f"{alert.joins} joins this minute "
+                   f"(baseline {alert.baseline:.1f}/min, threshold {alert.threshold})")
+        modlog.record(guild.id, 'raid_detected', reason=summary)
+        antiraid_log.warning("Possible raid: %s", summary, extra={'guild_id': guild.id})
         try:
             # Find a log channel
             log_channel = discord.utils.get(guild.text_channels, name='mod-log')
@@ -157,44 +339,33 @@ async def on_member_join(member):
             if log_channel:
                 embed = discord.Embed(
                     title="⚠️ Possible Raid Detected",
-                    description=f"{len(member_joins[guild.id])} members joined within 10 seconds!",
+                    description=f"{alert.joins} members joined in the last minute!",
                     color=discord.Color.orange(),
                     timestamp=datetime.utcnow()
                 )
+                embed.add_field(name="Usual Rate", value=f"{alert.baseline:.1f} ± {alert.stddev:.1f} joins/min")
+                embed.add_field(name="Threshold", value=f"{alert.threshold} joins/min")
                 await log_channel.send(embed=embed)
-            
-            # Clear the tracking
-            member_joins[guild.id] = []
-        except Exception as e:
-            print(f"Error handling raid detection: {e}")
+        except Exception:
+            antiraid_log.exception("Error handling raid detection", extra={'guild_id': guild.id})
     
     # Send welcome message
     try:
-        guild_id_str = str(guild.id)
-        channel_id = None
+        state = guild_states.get(guild.id)
+        channel_id = state.welcome_channel_id if state else None
         
-        # Check if welcome channel is configured for this guild
-        if guild_id_str in welcome_channels:
-            channel_id = welcome_channels[guild_id_str]
-        else:
-            # Check for direct channel ID (channel_ prefix) or use default
-            for key, ch_id in welcome_channels.items():
-                if key.startswith('channel_'):
-                    channel_id = ch_id
-                    break
-        
-        # If no channel found, use the default general channel ID
+        # Fall back to a direct channel entry (channel_ prefix), then the default general channel
         if channel_id is None:
-            channel_id = 1388945402333761698
+            channel_id = guild_states.default_welcome_channel_id() or DEFAULT_WELCOME_CHANNEL_ID
         
         channel = bot.get_channel(channel_id)
         if channel is None:
-            print(f"Welcome channel {channel_id} not found for guild {guild.name}")
+            welcome_log.warning("Welcome channel %s not found for guild %s", channel_id, guild.name)
             return
         
         # Get custom welcome message or use default
-        if guild_id_str in welcome_messages:
-            message = welcome_messages[guild_id_str]
+        if state and state.welcome_message is not None:
+            message = state.welcome_message
             # Replace placeholders in custom message
             message = message.replace("{member}", member.mention)
             message = message.replace("{guild}", guild.name)
@@ -212,11 +383,11 @@ async def on_member_join(member):
         embed.add_field(name="Member", value=f"{member.mention} ({member.display_name})", inline=False)
         
         await channel.send(embed=embed)
-        print(f"Sent welcome message for {member} in {channel.name}")
+        welcome_log.info("Sent welcome message for %s in %s", member, channel.name, extra={'guild_id': guild.id})
     except discord.Forbidden:
-        print(f"No permission to send welcome message in channel {channel_id}")
-    except Exception as e:
-        print(f"Error sending welcome message: {e}")
+        welcome_log.error("No permission to send welcome message in channel %s", channel_id)
+    except Exception:
+        welcome_log.exception("Error sending welcome message")
 
 # Anti-Raid: Detect mass mentions
 @bot.event
@@ -226,19 +397,7 @@ async def on_message(message):
     
     # Check for mass mentions (5+ mentions in one message)
     if len(message.mentions) >= 5:
-        try:
-            await message.delete()
-            await message.channel.send(f"{message.author.mention}, mass mentions are not allowed!")
-            
-            # Warn or timeout the user
-            try:
-                await message.author.timeout(timedelta(minutes=10), reason="Mass mention spam")
-            except:
-                pass
-        except discord.Forbidden:
-            print("No permission to delete message or timeout user")
-        except Exception as e:
-            print(f"Error handling mass mention: {e}")
+        moderation.punish(message, reason="Mass mention spam", warning="mass mentions are not allowed!")
     
     # Check for spam (same message repeated 5+ times)
     if message.guild:
@@ -249,17 +408,7 @@ async def on_message(message):
                 count += 1
         
         if count >= 5:
-            try:
-                await message.delete()
-                await message.channel.send(f"{message.author.mention}, spam is not allowed!")
-                try:
-                    await message.author.timeout(timedelta(minutes=10), reason="Spam")
-                except:
-                    pass
-            except discord.Forbidden:
-                print("No permission to delete spam message")
-            except Exception as e:
-                print(f"Error handling spam: {e}")
+            moderation.punish(message, reason="Spam", warning="spam is not allowed!")
     
     # Process custom commands
     if message.content.startswith('!'):
@@ -281,6 +430,7 @@ async def add_command(ctx, command_name: str, *, response: str):
         return
     
     custom_commands[command_name] = response
+    command_index.invalidate()
     save_commands()
     await ctx.send(f"✅ Custom command `!{command_name}` has been added!")
 
@@ -291,23 +441,154 @@ async def delete_command(ctx, command_name: str):
     command_name = command_name.lower()
     if command_name in custom_commands:
         del custom_commands[command_name]
+        command_index.invalidate()
         save_commands()
         await ctx.send(f"✅ Custom command `!{command_name}` has been deleted!")
     else:
         await ctx.send(f"❌ Command `!{command_name}` not found!")
 
 @bot.command(name='listcmd', aliases=['listcommands'])
-async def list_commands(ctx):
-    """List all custom commands"""
+async def list_commands(ctx, prefix: str = ''):
+    """List custom commands, optionally only those starting with a prefix
+    Usage: !listcmd [prefix]"""
     if not custom_commands:
         await ctx.send("No custom commands have been added yet!")
         return
     
+    prefix = prefix.lower().lstrip('!')
+    names = command_index.keys()
+    start, stop = command_index.prefix_range(prefix)
+    if start == stop:
+        await ctx.send(f"❌ No custom commands start with `!{prefix}`!")
+        return
+    
+    def render(first, last):
+        return discord.Embed(
+            title=f"Custom Commands starting with !{prefix}" if prefix else "Custom Commands",
+            description="\n".join(f"`!{name}`" for name in names[start + first:start + last]),
+            color=discord.Color.blue()
+        )
+    await Paginator(ctx.author.id, stop - start, render).send(ctx)
+
+@bot.command(name='modlog', aliases=['history'])
+@commands.has_permissions(manage_messages=True)
+async def mod_log(ctx, user: discord.User, since: str = None):
+    """Show moderation history for a user (Mod only)
+    Usage: !modlog <user mention or ID> [since]
+    Examples:
+    - !modlog @user
+    - !modlog 123456789012345678 7d"""
+    since_ts = None
+    if since:
+        delta = parse_duration(since)
+        if delta is None:
+            await ctx.send("❌ Invalid duration! Use e.g. `30m`, `12h` or `7d`.")
+            return
+        since_ts = time.time() - delta.total_seconds()
+    
+    started = time.perf_counter()
+    rows, total = await modlog.query(ctx.guild.id, user.id, since_ts)
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    if not rows:
+        await ctx.send(f"✅ No moderation history for {user}{f' in the last {since}' if since else ''}!")
+        return
+    
+    lines = []
+    for ts, action, moderator_id, reason in rows:
+        line = f"<t:{int(ts)}:R> **{action}**"
+        if reason:
+            line += f" - {reason}"
+        if moderator_id and moderator_id != bot.user.id:
+            line += f" (by <@{moderator_id}>)"
+        lines.append(line)
+    embed = discord.Embed(
+        title=f"📜 Moderation History: {user}",
+        description="\n".join(lines)[:4096],
+        color=discord.Color.blue()
+    )
+    embed.set_footer(text=f"Showing {len(rows)} of {total} entries • {elapsed_ms:.1f}ms")
+    await ctx.send(embed=embed)
+
+@bot.command(name='modstats')
+@commands.has_permissions(administrator=True)
+async def mod_stats(ctx):
+    """Show moderation action counters (Admin only)"""
+    if not moderation.stats:
+        await ctx.send("No moderation actions have been taken yet!")
+        return
+    
+    embed = discord.Embed(
+        title="🛡️ Moderation Actions",
+        description="\n".join(f"`{key}`: {count}" for key, count in sorted(moderation.stats.items())),
+        color=discord.Color.blue()
+    )
+    failures = [r for r in moderation.results if r.status == 'failed'][-5:]
+    if failures:
+        embed.add_field(
+            name="Recent Failures",
+            value="\n".join(f"{r.action} <@{r.user_id}>: {r.detail}" for r in failures)[:1024],
+            inline=False
+        )
+    await ctx.send(embed=embed)
+
+@bot.command(name='raidstats')
+@commands.has_permissions(manage_guild=True)
+async def raid_stats(ctx):
+    """Show this server's join rate and raid threshold for the last hour"""
+    stats = raid_detector.stats(ctx.guild.id)
+    if stats is None:
+        await ctx.send("No joins have been seen in this server yet!")
+        return
+    
+    history, baseline, stddev, threshold = stats
+    embed = discord.Embed(
+        title="📈 Join Rate (last 60 minutes)",
+        description=f"`{sparkline(history)}`",
+        color=discord.Color.blue()
+    )
+    embed.add_field(name="This Minute", value=f"{history[-1]} joins")
+    embed.add_field(name="Peak", value=f"{max(history)} joins/min")
+    embed.add_field(name="Baseline", value=f"{baseline:.2f} ± {stddev:.2f} joins/min")
+    embed.add_field(name="Raid Threshold", value=f"{threshold} joins/min")
+    await ctx.send(embed=embed)
+
+@bot.command(name='restprofile')
+@commands.has_permissions(administrator=True)
+async def rest_profile(ctx, view: str = 'calls'):
+    """Show which features spend the most time on Discord's REST API (Admin only)
+    Usage: !restprofile [calls|source|route|reset]
+    Requires REST_PROFILE=1; also served as JSON at /rest-profile with REST_PROFILE_TOKEN"""
+    profiler = rest_profiler.profiler
+    if not profiler.enabled:
+        await ctx.send("❌ REST profiling is off. Start the bot with `REST_PROFILE=1` to enable it.")
+        return
+    view = view.lower()
+    if view == 'reset':
+        profiler.reset()
+        await ctx.send("✅ REST profile counters reset!")
+        return
+    if view not in ('calls', 'source', 'route'):
+        await ctx.send("❌ Usage: `!restprofile [calls|source|route|reset]`")
+        return
+    
+    rows = profiler.report(group=None if view == 'calls' else view, limit=10)
+    if not rows:
+        await ctx.send("No REST calls have been recorded yet!")
+        return
+    lines = [
+        f"**{r['key']}** - {r['calls']} calls, {r['total_ms']:.0f}ms total "
+        f"(avg {r['avg_ms']:.0f}ms, p95 {r['p95_ms']:.0f}ms, waiting {r['wait_ms']:.0f}ms)"
+        + (f", {r['rate_limited']}× 429" if r['rate_limited'] else "")
+        + (f", {r['errors']} errors" if r['errors'] else "")
+        for r in rows
+    ]
+    minutes = (time.time() - profiler.started) / 60
     embed = discord.Embed(
-        title="Custom Commands",
-        description="\n".join([f"`!{cmd}`" for cmd in custom_commands.keys()]),
+        title="📡 REST Profile",
+        description="\n".join(lines)[:4096],
         color=discord.Color.blue()
     )
+    embed.set_footer(text=f"Top {len(rows)} by total time • last {minutes:.0f} minutes")
     await ctx.send(embed=embed)
 
 # Utility Commands
@@ -348,17 +629,112 @@ async def avatar(ctx, member: discord.Member = None):
     
     await ctx.send(embed=embed)
 
+# !clear limits: messages deleted per run, and how far back a filtered run may scan
+CLEAR_MAX = 5000
+CLEAR_SCAN_LIMIT = 20000
+SNOWFLAKE_MIN = 10 ** 15  # numbers this large are IDs, not amounts
+
 @bot.command(name='clear')
 @commands.has_permissions(manage_messages=True)
-async def clear(ctx, amount: int = 10):
-    """Clear messages (Mod only)"""
-    if amount > 100:
-        amount = 100
+async def clear(ctx, amount: Optional[int] = 10, *filters: str):
+    """Clear messages (Mod only)
+    Usage: !clear [amount] [filters...]
+    Filters: @user or user ID, since:<duration>, until:<duration>, regex:<pattern>, raiders[:<duration>]
+    Examples:
+    - !clear 50
+    - !clear 2000 raiders:15m
+    - !clear 500 @spammer "regex:free nitro" since:1h"""
+    if amount is not None and amount < 1:
+        await ctx.send("❌ The amount must be at least 1!")
+        return
+    if amount is not None and amount > CLEAR_MAX:
+        # `!clear <user ID>`: the int converter grabs the ID, so treat it as an author filter
+        if amount >= SNOWFLAKE_MIN:
+            filters = (str(amount), *filters)
+            amount = 10
+        else:
+            await ctx.send(f"❌ You can clear at most {CLEAR_MAX} messages at a time!")
+            return
+    if amount is None:
+        amount = 10
     try:
-        await ctx.channel.purge(limit=amount + 1)
-        await ctx.send(f"✅ Cleared {amount} messages!", delete_after=5)
+        purge_filter = PurgeFilter.parse(filters, ctx.message.mentions)
+    except ValueError as e:
+        await ctx.send(f"❌ {e}")
+        return
+    
+    # Without filters every scanned message matches, so there is no need to look further back
+    scan_limit = amount if purge_filter.is_empty() else CLEAR_SCAN_LIMIT
+    status = await ctx.send(f"🧹 Clearing up to {amount} messages...")
+    
+    async def progress(result):
+        await status.edit(content=f"🧹 Scanned {result.scanned} messages, deleted {result.deleted}...")
+    
+    try:
+        await ctx.message.delete()
+        result = await purge_channel(ctx.channel, amount, purge_filter, before=ctx.message,
+                                     scan_limit=scan_limit, progress=progress,
+                                     resolve_member=memory_profile.get_or_fetch_member)
     except discord.Forbidden:
-        await ctx.send("❌ I don't have permission to delete messages!")
+        await status.edit(content="❌ I don't have permission to delete messages!")
+        return
+    
+    modlog.record(ctx.guild.id, 'purge', moderator_id=ctx.author.id,
+                  reason=f"{result.deleted} messages in #{ctx.channel.name} (filters: {' '.join(filters) or 'none'})")
+    summary = f"✅ Cleared {result.deleted} messages!"
+    if result.failed:
+        summary += f" ({result.failed} could not be deleted: {result.errors[-1]})"
+    await status.edit(content=summary, delete_after=5)
+
+# Guilds with a restore in progress, so two admins can't double-create channels
+restoring_guilds = set()
+
+@bot.command(name='restore')
+@commands.has_permissions(administrator=True)
+async def restore(ctx, minutes: int = 60):
+    """Recreate channels and roles deleted in the last N minutes (Admin only)
+    Usage: !restore [minutes]
+    Default: 60 minutes. Deleted channels are remembered for 24 hours."""
+    guild = ctx.guild
+    if guild.id in restoring_guilds:
+        await ctx.send("❌ A restore is already running for this server!")
+        return
+    
+    channels, roles = structure_tracker.deleted_since(guild.id, time.time() - minutes * 60)
+    if not channels and not roles:
+        await ctx.send(f"✅ Nothing was deleted in the last {minutes} minutes!")
+        return
+    
+    restoring_guilds.add(guild.id)
+    try:
+        status = await ctx.send(f"♻️ Restoring {len(channels)} channels and {len(roles)} roles...")
+        started = time.monotonic()
+        restored, failed = await restore_guild(guild, channels, roles,
+                                               reason=f"Anti-nuke restore by {ctx.author}")
+        structure_tracker.forget_deleted(guild.id, [old_id for _, old_id, _, _ in restored])
+        modlog.record(guild.id, 'restore', moderator_id=ctx.author.id,
+                      reason=f"{len(restored)} restored, {len(failed)} failed")
+    finally:
+        restoring_guilds.discard(guild.id)
+    
+    embed = discord.Embed(
+        title="♻️ Restore Complete",
+        description=f"Restored {len(restored)} items in {time.monotonic() - started:.1f}s.",
+        color=discord.Color.green() if not failed else discord.Color.orange()
+    )
+    if restored:
+        embed.add_field(
+            name="Restored",
+            value="\n".join(f"{kind}: {detail or name}" for kind, _, name, detail in restored)[:1024],
+            inline=False
+        )
+    if failed:
+        embed.add_field(
+            name="Failed",
+            value="\n".join(f"{kind} {name}: {error}" for kind, _, name, error in failed)[:1024],
+            inline=False
+        )
+    await status.edit(content=None, embed=embed)
 
 @bot.command(name='text', aliases=['send', 'say'])
 @commands.has_permissions(administrator=True)
@@ -370,32 +746,11 @@ async def send_text(ctx, channel_input: str, *, message: str = None):
     - !text general This is a test message
     - !text 123456789012345678 Your message here"""
     try:
-        channel = None
-        
-        # Check if channel is mentioned
+        # Check if channel is mentioned, otherwise look it up by ID or name
         if ctx.message.channel_mentions:
             channel = ctx.message.channel_mentions[0]
         else:
-            # Remove # if present
-            channel_input_clean = channel_input.strip()
-            if channel_input_clean.startswith('#'):
-                channel_input_clean = channel_input_clean[1:]
-            
-            # Try to get by ID
-            if channel_input_clean.isdigit():
-                channel = bot.get_channel(int(channel_input_clean))
-                if channel and channel.guild != ctx.guild:
-                    channel = None
-            # Try to get by name (exact match)
-            else:
-                channel = discord.utils.get(ctx.guild.text_channels, name=channel_input_clean)
-            
-            # If still not found, try partial name match (case-insensitive)
-            if channel is None:
-                for ch in ctx.guild.text_channels:
-                    if channel_input_clean.lower() in ch.name.lower():
-                        channel = ch
-                        break
+            channel = resolve_text_channel(ctx.guild, channel_input)
         
         # Validate channel
         if channel is None:
@@ -422,7 +777,79 @@ async def send_text(ctx, channel_input: str, *, message: str = None):
             
     except Exception as e:
         await ctx.send(f"❌ Error: {e}")
-        print(f"Error in send_text command: {e}")
+        commands_log.exception("Error in send_text command")
+
+@bot.command(name='broadcast', aliases=['announce'])
+@commands.has_permissions(administrator=True)
+async def broadcast_text(ctx, *, args: str = None):
+    """Send a message to several channels at once (Admin only)
+    Usage: !broadcast <targets...> | <message>
+    Targets: #channel, channel name or ID, category:<name>, or all (bot owner only:
+    the morning channel of every server the bot is in)
+    Examples:
+    - !broadcast #general #news | Server maintenance tonight!
+    - !broadcast "category:Announcements" | New event this weekend!"""
+    if not args or '|' not in args:
+        await ctx.send("❌ Usage: `!broadcast <channels...> | <message>`")
+        return
+    
+    target_text, message = (part.strip() for part in args.split('|', 1))
+    if not message:
+        await ctx.send("❌ Please provide a message after `|`!")
+        return
+    try:
+        targets = shlex.split(target_text)
+    except ValueError as e:
+        await ctx.send(f"❌ Could not parse targets: {e}")
+        return
+    if not targets:
+        await ctx.send("❌ Please specify at least one channel before `|`!")
+        return
+    
+    channels, unknown = [], []
+    for target in targets:
+        if target.lower() == 'all':
+            if not await bot.is_owner(ctx.author):
+                await ctx.send("❌ Only the bot owner can broadcast to every server!")
+                return
+            # Every configured announcement (morning) channel the bot can see
+            channel_ids = [s.morning_channel_id for s in guild_states.guilds.values() if s.morning_channel_id]
+            channel_ids += [t.channel_id for t in guild_states.morning_targets.values()]
+            channels += [c for c in map(bot.get_channel, channel_ids) if isinstance(c, discord.TextChannel)]
+            continue
+        if target.lower().startswith('category:'):
+            name = target.split(':', 1)[1].strip().lower()
+            resolved = next((c for c in ctx.guild.categories if c.name.lower() == name), None)
+        else:
+            resolved = resolve_text_channel(ctx.guild, target)
+        if isinstance(resolved, discord.CategoryChannel):
+            channels += resolved.text_channels
+        elif isinstance(resolved, discord.TextChannel):
+            channels.append(resolved)
+        else:
+            unknown.append(target)
+    
+    if unknown:
+        await ctx.send(f"❌ Unknown channels or categories: {', '.join(f'`{t}`' for t in unknown)}")
+        return
+    if not channels:
+        await ctx.send("❌ No text channels matched those targets!")
+        return
+    
+    results = await broadcast(channels, message)
+    failures = [(channel, error) for channel, error in results if error]
+    embed = discord.Embed(
+        title="📢 Broadcast Summary",
+        description=f"Sent to {len(results) - len(failures)}/{len(results)} channels.",
+        color=discord.Color.green() if not failures else discord.Color.orange()
+    )
+    if failures:
+        embed.add_field(
+            name="Failed",
+            value="\n".join(f"{channel.guild.name} {channel.mention}: {error}" for channel, error in failures)[:1024],
+            inline=False
+        )
+    await ctx.send(embed=embed)
 
 # Morning Message Commands
 @bot.command(name='setmorning', aliases=['morningchannel', 'setmorningchannel'])
@@ -484,22 +911,22 @@ async def set_morning_channel(ctx, *, channel_input: str = None):
             return
         
         # Save the channel
-        morning_channels[str(ctx.guild.id)] = channel.id
+        guild_states.ensure(ctx.guild.id).morning_channel_id = channel.id
         save_morning_settings()
         await ctx.send(f"✅ Morning messages will be sent to {channel.mention}!")
         
     except Exception as e:
         await ctx.send(f"❌ Error setting morning channel: {e}")
-        print(f"Error in set_morning_channel: {e}")
+        commands_log.exception("Error in set_morning_channel")
 
 @bot.command(name='removemorning', aliases=['removemorningchannel'])
 @commands.has_permissions(administrator=True)
 async def remove_morning_channel(ctx):
     """Remove morning messages for this server (Admin only)"""
-    if str(ctx.guild.id) in morning_channels:
-        del morning_channels[str(ctx.guild.id)]
-        if str(ctx.guild.id) in morning_messages:
-            del morning_messages[str(ctx.guild.id)]
+    state = guild_states.get(ctx.guild.id)
+    if state and state.morning_channel_id is not None:
+        state.morning_channel_id = None
+        state.morning_message = None
         save_morning_settings()
         await ctx.send("✅ Morning messages have been disabled for this server!")
     else:
@@ -514,11 +941,11 @@ async def set_morning_message(ctx, *, input_text: str = None):
     - !setmorningmsg Hello everyone!
     - !setmorningmsg #general Hello everyone!
     - !setmorningmsg (empty) - Reset to default message"""
-    guild_id = str(ctx.guild.id)
+    state = guild_states.ensure(ctx.guild.id)
     
     if input_text is None or input_text.strip() == "":
-        if guild_id in morning_messages:
-            del morning_messages[guild_id]
+        if state.morning_message is not None:
+            state.morning_message = None
             save_morning_settings()
             await ctx.send("✅ Morning message reset to default!")
         else:
@@ -567,33 +994,79 @@ async def set_morning_message(ctx, *, input_text: str = None):
         if not isinstance(channel, discord.TextChannel):
             await ctx.send("❌ Please specify a text channel!")
             return
-        morning_channels[guild_id] = channel.id
-        save_morning_settings()
-    elif guild_id not in morning_channels:
+        state.morning_channel_id = channel.id
+    elif state.morning_channel_id is None:
         # No channel set and none specified, use current channel
-        morning_channels[guild_id] = ctx.channel.id
-        save_morning_settings()
+        state.morning_channel_id = ctx.channel.id
         channel = ctx.channel
     
-    # Save the message
-    morning_messages[guild_id] = message
+    # Save the message (and channel, if it changed)
+    state.morning_message = message
     save_morning_settings()
     
     # Get channel for display
     if not channel:
-        channel_id = morning_channels[guild_id]
+        channel_id = state.morning_channel_id
         channel = bot.get_channel(channel_id) or ctx.channel
     
     await ctx.send(f"✅ Custom morning message set!\n**Preview:** {message}\n\n📌 **Channel:** {channel.mention}")
 
+def settings_entry(key, kind):
+    """(label, channel_id, message) for a morning/welcome settings key, or None if it is gone"""
+    if not key.isdigit():
+        targets = guild_states.morning_targets if kind == 'morning' else guild_states.welcome_targets
+        target = targets.get(key)
+        return ("Direct channel entry", target.channel_id, target.message) if target else None
+    state = guild_states.get(int(key))
+    if state is None:
+        return None
+    guild = bot.get_guild(state.guild_id)
+    label = guild.name if guild else f"Server {state.guild_id}"
+    if kind == 'morning':
+        return label, state.morning_channel_id, state.morning_message
+    return label, state.welcome_channel_id, state.welcome_message
+
+async def send_settings_listing(ctx, kind, index, title, color):
+    """Paginated listing of every server's morning/welcome settings (bot owner only)"""
+    if not await bot.is_owner(ctx.author):
+        await ctx.send("❌ Only the bot owner can list every server's settings!")
+        return
+    keys = index.keys()
+    if not keys:
+        await ctx.send(f"No {kind} messages are configured in any server!")
+        return
+    
+    def render(start, stop):
+        lines = []
+        for key in keys[start:stop]:
+            entry = settings_entry(key, kind)
+            if entry is None:
+                continue
+            label, channel_id, message = entry
+            channel = f"<#{channel_id}>" if channel_id else "default channel"
+            if message is None:
+                preview = "Using default message"
+            else:
+                preview = message.replace('\n', ' ')
+                preview = preview if len(preview) <= 100 else preview[:97] + '...'
+            lines.append(f"**{label}** (`{key}`) → {channel}\n{preview}")
+        return discord.Embed(title=title, description="\n\n".join(lines) or "Nothing here anymore.", color=color)
+    await Paginator(ctx.author.id, len(keys), render, page_size=10).send(ctx)
+
 @bot.command(name='morninginfo')
-async def morning_info(ctx):
-    """Check morning message settings"""
-    guild_id = str(ctx.guild.id)
+async def morning_info(ctx, scope: str = None):
+    """Check morning message settings
+    Usage: !morninginfo [all] (all: every server, bot owner only)"""
+    if scope and scope.lower() == 'all':
+        await send_settings_listing(ctx, 'morning', morning_index, "🌅 Morning Messages (all servers)",
+                                    discord.Color.gold())
+        return
+    
+    state = guild_states.get(ctx.guild.id)
     
-    if guild_id not in morning_channels:
+    if state is None or state.morning_channel_id is None:
         # Check if message is set but channel is not
-        if guild_id in morning_messages:
+        if state and state.morning_message is not None:
             await ctx.send("❌ Morning message is set, but no channel is configured!\n"
                           f"Use `!setmorning #channel` or `!setmorning` to set the channel.\n"
                           f"Or use `!setmorningmsg` again to automatically set this channel.")
@@ -602,7 +1075,7 @@ async def morning_info(ctx):
                           f"Use `!setmorning #channel` to set the channel first.")
         return
     
-    channel_id = morning_channels[guild_id]
+    channel_id = state.morning_channel_id
     channel = bot.get_channel(channel_id)
     
     embed = discord.Embed(
@@ -615,8 +1088,8 @@ async def morning_info(ctx):
     else:
         embed.add_field(name="Channel", value="Channel not found!", inline=False)
     
-    if guild_id in morning_messages:
-        embed.add_field(name="Custom Message", value=morning_messages[guild_id], inline=False)
+    if state.morning_message is not None:
+        add_long_field(embed, "Custom Message", state.morning_message)
     else:
         embed.add_field(name="Custom Message", value="Using default message", inline=False)
     
@@ -626,11 +1099,11 @@ async def morning_info(ctx):
 @commands.has_permissions(administrator=True)
 async def test_morning(ctx):
     """Test the morning message (Admin only)"""
-    guild_id = str(ctx.guild.id)
+    state = guild_states.get(ctx.guild.id)
     
-    if guild_id not in morning_channels:
+    if state is None or state.morning_channel_id is None:
         # Check if message is set but channel is not
-        if guild_id in morning_messages:
+        if state and state.morning_message is not None:
             await ctx.send("❌ Morning message is set, but no channel is configured!\n"
                           f"Use `!setmorning #channel` or `!setmorning` to set the channel.\n"
                           f"Or use `!setmorningmsg` again to automatically set this channel.")
@@ -639,7 +1112,7 @@ async def test_morning(ctx):
                           f"Use `!setmorning #channel` to set the channel first.")
         return
     
-    channel_id = morning_channels[guild_id]
+    channel_id = state.morning_channel_id
     channel = bot.get_channel(channel_id)
     
     if channel is None:
@@ -647,10 +1120,7 @@ async def test_morning(ctx):
         return
     
     # Get custom message or use default
-    if guild_id in morning_messages:
-        message = morning_messages[guild_id]
-    else:
-        message = "🌅 Good morning everyone! Have a great day! 🌅"
+    message = state.morning_message if state.morning_message is not None else DEFAULT_MORNING_MESSAGE
     
     try:
         await channel.send(f"@everyone {message}")
@@ -709,13 +1179,13 @@ async def set_welcome_channel(ctx, *, channel_input: str = None):
             return
         
         # Save the channel
-        welcome_channels[str(ctx.guild.id)] = channel.id
+        guild_states.ensure(ctx.guild.id).welcome_channel_id = channel.id
         save_morning_settings()
         await ctx.send(f"✅ Welcome messages will be sent to {channel.mention}!")
         
     except Exception as e:
         await ctx.send(f"❌ Error setting welcome channel: {e}")
-        print(f"Error in set_welcome_channel: {e}")
+        commands_log.exception("Error in set_welcome_channel")
 
 @bot.command(name='setwelcomemsg', aliases=['welcomemessage', 'customwelcome'])
 @commands.has_permissions(administrator=True)
@@ -725,11 +1195,11 @@ async def set_welcome_message(ctx, *, message: str = None):
     Example: !setwelcomemsg Welcome to our server! Enjoy your stay!
     Use {member} to mention the new member and {guild} for server name.
     Leave empty to reset to default."""
-    guild_id = str(ctx.guild.id)
+    state = guild_states.ensure(ctx.guild.id)
     
     if message is None or message.strip() == "":
-        if guild_id in welcome_messages:
-            del welcome_messages[guild_id]
+        if state.welcome_message is not None:
+            state.welcome_message = None
             save_morning_settings()
             await ctx.send("✅ Welcome message reset to default!")
         else:
@@ -737,21 +1207,27 @@ async def set_welcome_message(ctx, *, message: str = None):
         return
     
     # Save the message
-    welcome_messages[guild_id] = message.strip()
+    state.welcome_message = message.strip()
     save_morning_settings()
     
     # Get channel for display
-    channel_id = welcome_channels.get(guild_id, 1388945402333761698)
+    channel_id = state.welcome_channel_id or DEFAULT_WELCOME_CHANNEL_ID
     channel = bot.get_channel(channel_id) or ctx.channel
     
     await ctx.send(f"✅ Custom welcome message set!\n**Preview:** {message.strip()}\n\n📌 **Channel:** {channel.mention if hasattr(channel, 'mention') else 'Default channel'}")
 
 @bot.command(name='welcomeinfo')
-async def welcome_info(ctx):
-    """Check welcome message settings"""
-    guild_id = str(ctx.guild.id)
+async def welcome_info(ctx, scope: str = None):
+    """Check welcome message settings
+    Usage: !welcomeinfo [all] (all: every server, bot owner only)"""
+    if scope and scope.lower() == 'all':
+        await send_settings_listing(ctx, 'welcome', welcome_index, "👋 Welcome Messages (all servers)",
+                                    discord.Color.green())
+        return
+    
+    state = guild_states.get(ctx.guild.id)
     
-    channel_id = welcome_channels.get(guild_id, 1388945402333761698)
+    channel_id = state.welcome_channel_id if state and state.welcome_channel_id else DEFAULT_WELCOME_CHANNEL_ID
     channel = bot.get_channel(channel_id)
     
     embed = discord.Embed(
@@ -764,18 +1240,15 @@ async def welcome_info(ctx):
     else:
         embed.add_field(name="Channel", value=f"Channel ID: {channel_id}", inline=False)
     
-    if guild_id in welcome_messages:
-        embed.add_field(name="Custom Message", value=welcome_messages[guild_id], inline=False)
+    if state and state.welcome_message is not None:
+        add_long_field(embed, "Custom Message", state.welcome_message)
     else:
         embed.add_field(name="Custom Message", value="Using default message", inline=False)
     
     await ctx.send(embed=embed)
 
-# Track which servers already received morning message today
-morning_sent_today = set()
-
 # IST timezone
-IST = pytz.timezone('Asia/Kolkata')
+IST = ZoneInfo('Asia/Kolkata')
 
 # Morning Message Task - Check every hour
 @tasks.loop(hours=1)
@@ -784,19 +1257,26 @@ async def morning_message_task():
     await bot.wait_until_ready()
     
     # Get current time in IST
-    now_utc = datetime.now(pytz.UTC)
+    now_utc = datetime.now(timezone.utc)
     now_ist = now_utc.astimezone(IST)
     current_date = now_ist.date()
     
-    # Reset daily tracking at midnight IST
-    if now_ist.hour == 0:
-        morning_sent_today.clear()
-    
     # Send morning messages at 8 AM IST
     if now_ist.hour == 8 and now_ist.minute < 1:
-        for key, channel_id in morning_channels.items():
+        # Guild-configured channels plus direct channel entries, each remembering
+        # the IST date it was last sent on (in the named field)
+        targets = [
+            (state, state.morning_channel_id, state.morning_message, 'morning_sent_on')
+            for state in guild_states.guilds.values() if state.morning_channel_id is not None
+        ]
+        targets += [
+            (target, target.channel_id, target.message, 'sent_on')
+            for target in guild_states.morning_targets.values()
+        ]
+        sent_any = False
+        for record, channel_id, custom_message, sent_field in targets:
             # Check if we already sent today
-            if key in morning_sent_today:
+            if getattr(record, sent_field) == current_date:
                 continue
                 
             try:
@@ -808,21 +1288,27 @@ async def morning_message_task():
                 guild = channel.guild if hasattr(channel, 'guild') and channel.guild else None
                 
                 # Get custom message or use default
-                if key in morning_messages:
-                    message = morning_messages[key]
-                else:
-                    message = "🌅 Good morning everyone! Have a great day! 🌅"
+                message = custom_message if custom_message is not None else DEFAULT_MORNING_MESSAGE
                 
                 # Send message with @everyone mention
                 await channel.send(f"@everyone {message}")
-                morning_sent_today.add(key)
+                setattr(record, sent_field, current_date)
+                sent_any = True
                 guild_name = guild.name if guild else "Unknown"
                 channel_name = channel.name if hasattr(channel, 'name') else str(channel_id)
-                print(f"Sent morning message to {guild_name} in {channel_name} at {now_ist.strftime('%Y-%m-%d %H:%M:%S IST')}")
+                morning_log.info("Sent morning message to %s in %s at %s", guild_name, channel_name,
+                                 now_ist.strftime('%Y-%m-%d %H:%M:%S IST'))
             except discord.Forbidden:
-                print(f"No permission to send message in channel {channel_id}")
-            except Exception as e:
-                print(f"Error sending morning message: {e}")
+                morning_log.error("No permission to send message in channel %s", channel_id)
+            except Exception:
+                morning_log.exception("Error sending morning message")
+        
+        # Persist the sent dates right away so a restart inside the window can't resend
+        if sent_any:
+            try:
+                await save_snapshot()
+            except OSError:
+                morning_log.exception("Could not save snapshot after morning messages")
 
 # Start the task when bot is ready
 @morning_message_task.before_loop
@@ -839,14 +1325,13 @@ async def before_morning_task():
 BUMP_CHANNEL_ID = 1454191176264585308
 BUMP_APPLICATION_ID = 947088344167366698  # Application ID of the bot that owns /bump command
 
-# Cache for command ID to avoid fetching every time
-bump_command_id_cache = {}
-
 async def get_bump_command_id(guild_id):
-    """Fetch the actual command ID for /bump command"""
-    if guild_id in bump_command_id_cache:
-        return bump_command_id_cache[guild_id]
+    """Fetch the actual command ID for /bump command (cached on the guild state)"""
+    state = guild_states.ensure(guild_id)
+    if state.bump_command_id is not None:
+        return state.bump_command_id
     
+    import aiohttp
     try:
         url = f"https://discord.com/api/v10/applications/{BUMP_APPLICATION_ID}/guilds/{guild_id}/commands"
         headers = {
@@ -854,7 +1339,7 @@ async def get_bump_command_id(guild_id):
             "Content-Type": "application/json"
         }
         
-        async with aiohttp.ClientSession() as session:
+        async with aiohttp.ClientSession(trace_configs=rest_profiler.profiler.trace_configs()) as session:
             async with session.get(url, headers=headers) as response:
                 if response.status == 200:
                     commands = await response.json()
@@ -862,17 +1347,17 @@ async def get_bump_command_id(guild_id):
                     for cmd in commands:
                         if cmd.get("name") == "bump":
                             command_id = cmd.get("id")
-                            bump_command_id_cache[guild_id] = command_id
-                            print(f"✅ Found /bump command ID: {command_id}")
+                            state.bump_command_id = command_id
+                            bump_log.info("Found /bump command ID: %s", command_id)
                             return command_id
-                    print(f"⚠️  /bump command not found in application commands")
+                    bump_log.warning("/bump command not found in application commands")
                     return None
                 else:
                     response_text = await response.text()
-                    print(f"⚠️  Failed to fetch commands. Status: {response.status}, Response: {response_text}")
+                    bump_log.warning("Failed to fetch commands. Status: %s, Response: %s", response.status, response_text)
                     return None
-    except Exception as e:
-        print(f"❌ Error fetching command ID: {e}")
+    except Exception:
+        bump_log.exception("Error fetching command ID")
         return None
 
 # Bump Task - Runs every 2 hours
@@ -881,21 +1366,22 @@ async def bump_task():
     """Execute /bump slash command in the specified channel every 2 hours"""
     await bot.wait_until_ready()
     
+    import aiohttp
     try:
         channel = bot.get_channel(BUMP_CHANNEL_ID)
         if channel is None:
-            print(f"⚠️  Bump channel {BUMP_CHANNEL_ID} not found!")
+            bump_log.warning("Bump channel %s not found!", BUMP_CHANNEL_ID)
             return
         
         guild = channel.guild
         if guild is None:
-            print(f"⚠️  Channel {BUMP_CHANNEL_ID} is not in a guild!")
+            bump_log.warning("Channel %s is not in a guild!", BUMP_CHANNEL_ID)
             return
         
         # Get the actual command ID
         command_id = await get_bump_command_id(guild.id)
         if command_id is None:
-            print(f"⚠️  Could not find /bump command ID. Skipping this run.")
+            bump_log.warning("Could not find /bump command ID. Skipping this run.")
             return
         
         # Execute the slash command using Discord's interaction API
@@ -919,33 +1405,45 @@ async def bump_task():
         }
         
         # Use aiohttp to make the request
-        async with aiohttp.ClientSession() as session:
+        async with aiohttp.ClientSession(trace_configs=rest_profiler.profiler.trace_configs()) as session:
             async with session.post(url, json=payload, headers=headers) as response:
                 if response.status == 204:
-                    print(f"✅ Executed /bump command in channel {channel.name} (ID: {BUMP_CHANNEL_ID})")
+                    bump_log.info("Executed /bump command in channel %s (ID: %s)", channel.name, BUMP_CHANNEL_ID)
                 elif response.status == 401:
-                    print(f"❌ Authentication failed. Check bot token.")
+                    bump_log.error("Authentication failed. Check bot token.")
                 elif response.status == 403:
-                    print(f"❌ Forbidden. Bot may not have permission to execute this command.")
+                    bump_log.error("Forbidden. Bot may not have permission to execute this command.")
                 elif response.status == 400:
                     response_text = await response.text()
-                    print(f"❌ Bad request. Response: {response_text}")
-                    print(f"   Note: Discord bots cannot directly execute other bots' slash commands.")
-                    print(f"   This is a Discord API limitation.")
+                    bump_log.error("Bad request. Response: %s. Note: Discord bots cannot directly execute "
+                                   "other bots' slash commands. This is a Discord API limitation.", response_text)
                 else:
                     response_text = await response.text()
-                    print(f"⚠️  Failed to execute /bump command. Status: {response.status}, Response: {response_text}")
+                    bump_log.warning("Failed to execute /bump command. Status: %s, Response: %s", response.status, response_text)
                     
     except discord.Forbidden:
-        print(f"❌ No permission to execute commands in bump channel {BUMP_CHANNEL_ID}")
-    except Exception as e:
-        print(f"❌ Error executing bump command: {e}")
+        bump_log.error("No permission to execute commands in bump channel %s", BUMP_CHANNEL_ID)
+    except Exception:
+        bump_log.exception("Error executing bump command")
 
 # Start the bump task when bot is ready
 @bump_task.before_loop
 async def before_bump_task():
     await bot.wait_until_ready()
 
+# Settings hot reload - poll the settings files for out-of-band edits
+@tasks.loop(seconds=SETTINGS_POLL_SECONDS)
+async def settings_watch_task():
+    await settings_watcher.check()
+
+# Warm-restart snapshots of volatile state
+@tasks.loop(seconds=SNAPSHOT_INTERVAL)
+async def snapshot_task():
+    try:
+        await save_snapshot()
+    except OSError:
+        log.exception("Could not save snapshot %s", SNAPSHOT_FILE)
+
 # Error handling
 @bot.event
 async def on_command_error(ctx, error):
@@ -958,10 +1456,38 @@ async def on_command_error(ctx, error):
     elif isinstance(error, commands.MissingRequiredArgument):
         await ctx.send(f"❌ Missing required argument: {error}")
     else:
-        print(f"Error: {error}")
+        commands_log.error("Error in command %s: %s", ctx.command, error, exc_info=error)
         # Send user-friendly error message
         await ctx.send(f"❌ An error occurred: {str(error)}")
 
+def run_webserver():
+    import webserver
+    webserver.run()
+
+async def main(token):
+    """Log in and load settings in parallel, then connect to the gateway"""
+    async with bot:
+        async def login():
+            async with startup_timer.async_phase('login'):
+                await bot.login(token)
+        await asyncio.gather(login(), asyncio.to_thread(load_settings))
+        watch_settings()
+        modlog.start()
+        # Treat SIGTERM (e.g. a redeploy) like Ctrl+C so the final snapshot is written
+        try:
+            asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, lambda: asyncio.ensure_future(bot.close()))
+        except NotImplementedError:
+            pass  # Windows
+        try:
+            await bot.connect()
+        finally:
+            if not MEASURE_STARTUP:
+                try:
+                    snapshot.save_snapshot(SNAPSHOT_FILE, collect_snapshot())
+                except OSError:
+                    log.exception("Could not save final snapshot %s", SNAPSHOT_FILE)
+            modlog.stop()  # flush queued audit entries
+
 # Run the bot
 if __name__ == "__main__":
     # Get token from environment variable or config
@@ -972,8 +1498,14 @@ if __name__ == "__main__":
         TOKEN = input("Enter your Discord bot token: ").strip()
     
     if TOKEN:
-        webserver.keep_alive()  # Start Flask server in background thread
-        bot.run(TOKEN)          # Then run Discord bot
+        if not MEASURE_STARTUP:
+            # Start Flask server in background thread (importing Flask there too)
+            threading.Thread(target=run_webserver, daemon=True).start()
+        setup_logging()  # also routes discord.py's own logging through the queue
+        try:
+            asyncio.run(main(TOKEN))  # Then run Discord bot
+        except KeyboardInterrupt:
+            pass
     else:
         print("❌ No token provided. Exiting...")
 
@@ -0,0 +1,52 @@
+"""Concurrent fan-out of one message to many channels, used by !broadcast."""
+import asyncio
+from collections import defaultdict
+
+import discord
+
+from ratelimit import TokenBucket, call_with_retry
+
+# Shared across broadcasts: stay under Discord's global limit of 50 requests/second
+GLOBAL_BUDGET = TokenBucket(rate=40)
+# Sends allowed in flight per channel (Discord allows 5 messages / 5s per channel)
+PER_CHANNEL_CONCURRENCY = 1
+
+_channel_locks = defaultdict(lambda: asyncio.Semaphore(PER_CHANNEL_CONCURRENCY))
+
+
+def resolve_text_channel(guild, text):
+    """Find a channel from a mention, ID or (partial) name within a guild"""
+    text = text.strip().strip('<>').lstrip('#')
+    if text.isdigit():
+        # Dict lookup on the guild; only channels of this guild can match
+        channel = guild.get_channel(int(text))
+        if channel is not None:
+            return channel
+    channel = discord.utils.get(guild.text_channels, name=text)
+    if channel is None:
+        # Fall back to partial name match (case-insensitive)
+        lowered = text.lower()
+        channel = next((ch for ch in guild.text_channels if lowered in ch.name.lower()), None)
+    return channel
+
+
+async def broadcast(channels, content, concurrency=10, budget=GLOBAL_BUDGET):
+    """Send `content` to every channel concurrently.
+
+    Returns a list of (channel, error) pairs where error is None on success."""
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def send(channel):
+        async with semaphore, _channel_locks[channel.id]:
+            await budget.acquire()
+            try:
+                await call_with_retry(lambda: channel.send(content))
+            except discord.Forbidden:
+                return channel, "missing permissions"
+            except discord.HTTPException as e:
+                return channel, f"HTTP {e.status}: {e.text}"
+            return channel, None
+
+    # Same channel listed twice (e.g. by name and via its category) only gets one message
+    unique = list({channel.id: channel for channel in channels}.values())
+    return await asyncio.gather(*(send(channel) for channel in unique))
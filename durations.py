@@ -0,0 +1,17 @@
+import re
+from datetime import timedelta
+
+_DURATION_PART = re.compile(r'(\d+)\s*([smhdw])', re.IGNORECASE)
+_UNITS = {'s': 'seconds', 'm': 'minutes', 'h': 'hours', 'd': 'days', 'w': 'weeks'}
+
+
+def parse_duration(text):
+    """Parse durations like '30m', '2h', '1d12h' into a timedelta (None if invalid)"""
+    text = text.strip().replace(' ', '')
+    if not text:
+        return None
+    parts = _DURATION_PART.findall(text)
+    # Reject leftovers such as '10x' or '5m!'
+    if ''.join(f"{n}{u}" for n, u in parts).lower() != text.lower():
+        return None
+    return sum((timedelta(**{_UNITS[u.lower()]: int(n)}) for n, u in parts), timedelta())
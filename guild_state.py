@@ -0,0 +1,204 @@
+"""Per-guild runtime state, kept in one registry keyed by integer guild ID.
+
+The settings file format (morning_settings.json) is unchanged: guild IDs are
+stored as strings, and any other key (normally `channel_<something>`) names an
+entry whose value points straight at a channel rather than a guild. Entries the
+registry doesn't understand are kept as-is and written back on save."""
+from dataclasses import dataclass
+from datetime import date
+
+CHANNEL_KEY_PREFIX = 'channel_'  # conventional prefix for channel-keyed entries
+SETTINGS_SECTIONS = ('channels', 'messages', 'welcome_channels', 'welcome_messages')
+
+
+def _is_id(value):
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+@dataclass(slots=True)
+class GuildState:
+    """Everything the bot tracks for one guild"""
+    guild_id: int
+    morning_channel_id: int | None = None
+    morning_message: str | None = None
+    welcome_channel_id: int | None = None
+    welcome_message: str | None = None
+    morning_sent_on: date | None = None  # IST date the morning message last went out
+    bump_command_id: str | None = None
+
+
+@dataclass(slots=True)
+class ChannelTarget:
+    """A settings entry that names a channel directly (e.g. `channel_<id>`) instead of a guild"""
+    key: str  # the settings key, kept verbatim
+    channel_id: int  # the stored value
+    message: str | None = None
+    sent_on: date | None = None
+
+
+@dataclass(slots=True)
+class ParsedSettings:
+    """A validated settings file, ready to be swapped into the registry"""
+    guilds: dict  # {guild_id: {field: value}}
+    morning_targets: dict  # {settings key: ChannelTarget}
+    welcome_targets: dict
+    unknown: dict  # {section: entries}
+
+
+def parse_settings(data):
+    """Validate a settings file and build its contents without touching any registry.
+
+    Raises ValueError if the file isn't laid out as expected; safe to run in a worker thread."""
+    if not isinstance(data, dict):
+        raise ValueError("settings file must contain a JSON object")
+    for section in SETTINGS_SECTIONS:
+        if not isinstance(data.get(section, {}), dict):
+            raise ValueError(f"section '{section}' must be an object")
+    parsed = ParsedSettings({}, {}, {}, {
+        section: value for section, value in data.items() if section not in SETTINGS_SECTIONS
+    })
+
+    def keep(section, key, value):
+        parsed.unknown.setdefault(section, {})[key] = value
+
+    for field, section, targets in (
+        ('morning_channel_id', 'channels', parsed.morning_targets),
+        ('welcome_channel_id', 'welcome_channels', parsed.welcome_targets),
+    ):
+        for key, value in data.get(section, {}).items():
+            if not _is_id(value):
+                keep(section, key, value)
+            elif key.isdigit():
+                parsed.guilds.setdefault(int(key), {})[field] = value
+            else:
+                targets[key] = ChannelTarget(key, value)
+
+    for field, section, targets in (
+        ('morning_message', 'messages', parsed.morning_targets),
+        ('welcome_message', 'welcome_messages', parsed.welcome_targets),
+    ):
+        for key, value in data.get(section, {}).items():
+            if not isinstance(value, str):
+                keep(section, key, value)
+            elif key.isdigit():
+                parsed.guilds.setdefault(int(key), {})[field] = value
+            elif key in targets:
+                targets[key].message = value
+            else:
+                keep(section, key, value)  # message for an entry without a channel
+    return parsed
+
+
+class GuildStateRegistry:
+    """Single lookup point for per-guild state"""
+    __slots__ = ('guilds', 'morning_targets', 'welcome_targets', 'unknown')
+
+    def __init__(self):
+        self.guilds = {}  # {guild_id: GuildState}
+        self.morning_targets = {}  # {settings key: ChannelTarget}
+        self.welcome_targets = {}  # {settings key: ChannelTarget}
+        self.unknown = {}  # {section: entries} we can't interpret, written back unchanged on save
+
+    def __len__(self):
+        return len(self.guilds)
+
+    def get(self, guild_id):
+        """Return the state for a guild, or None if nothing is tracked for it"""
+        return self.guilds.get(guild_id)
+
+    def ensure(self, guild_id):
+        """Return the state for a guild, creating an empty one if needed"""
+        state = self.guilds.get(guild_id)
+        if state is None:
+            state = self.guilds[guild_id] = GuildState(guild_id)
+        return state
+
+    def default_welcome_channel_id(self):
+        """First channel-keyed welcome entry, used for guilds without their own channel"""
+        target = next(iter(self.welcome_targets.values()), None)
+        return target.channel_id if target else None
+
+    # ----- settings file (de)serialization -----
+
+    def load_settings(self, data):
+        """Replace configured values with those from a parsed settings file"""
+        self.apply_settings(parse_settings(data))
+
+    def apply_settings(self, parsed):
+        """Swap in the output of parse_settings() in one step (cannot fail halfway).
+
+        Runtime-only fields (morning_sent_on, bump_command_id) are kept."""
+        for state in self.guilds.values():
+            state.morning_channel_id = state.morning_message = None
+            state.welcome_channel_id = state.welcome_message = None
+        for guild_id, fields in parsed.guilds.items():
+            state = self.ensure(guild_id)
+            for field, value in fields.items():
+                setattr(state, field, value)
+        # Carry sent_on over for entries that still point at the same channel
+        for targets, old_targets in ((parsed.morning_targets, self.morning_targets),
+                                     (parsed.welcome_targets, self.welcome_targets)):
+            for key, target in targets.items():
+                old = old_targets.get(key)
+                if old is not None and old.channel_id == target.channel_id:
+                    target.sent_on = old.sent_on
+        self.morning_targets = parsed.morning_targets
+        self.welcome_targets = parsed.welcome_targets
+        self.unknown = parsed.unknown
+
+    def to_settings(self):
+        """Serialize configured values back into the settings file layout"""
+        data = {section: {} for section in SETTINGS_SECTIONS}
+        for state in self.guilds.values():
+            key = str(state.guild_id)
+            if state.morning_channel_id is not None:
+                data['channels'][key] = state.morning_channel_id
+            if state.morning_message is not None:
+                data['messages'][key] = state.morning_message
+            if state.welcome_channel_id is not None:
+                data['welcome_channels'][key] = state.welcome_channel_id
+            if state.welcome_message is not None:
+                data['welcome_messages'][key] = state.welcome_message
+        for targets, channels, messages in (
+            (self.morning_targets, 'channels', 'messages'),
+            (self.welcome_targets, 'welcome_channels', 'welcome_messages'),
+        ):
+            for key, target in targets.items():
+                data[channels][key] = target.channel_id
+                if target.message is not None:
+                    data[messages][key] = target.message
+        for section, entries in self.unknown.items():
+            if section in data:
+                data[section].update(entries)
+            else:
+                data[section] = entries
+        return data
+
+    # ----- warm-restart snapshot (runtime-only fields) -----
+
+    def runtime_snapshot(self):
+        """Runtime fields that aren't in the settings file, for snapshot.py"""
+        guilds = {}
+        for state in self.guilds.values():
+            if state.morning_sent_on is not None or state.bump_command_id is not None:
+                sent_on = state.morning_sent_on.isoformat() if state.morning_sent_on else None
+                guilds[str(state.guild_id)] = [sent_on, state.bump_command_id]
+        targets = {
+            key: target.sent_on.isoformat()
+            for key, target in self.morning_targets.items() if target.sent_on is not None
+        }
+        return {'guilds': guilds, 'morning_targets': targets}
+
+    def restore_runtime(self, data):
+        """Restore runtime fields from runtime_snapshot() output (load settings first)"""
+        for key, (sent_on, bump_command_id) in data.get('guilds', {}).items():
+            state = self.ensure(int(key))
+            if sent_on is not None:
+                state.morning_sent_on = date.fromisoformat(sent_on)
+            if bump_command_id is not None:
+                state.bump_command_id = bump_command_id
+        for key, sent_on in data.get('morning_targets', {}).items():
+            # Targets removed from the settings file since the snapshot are skipped
+            target = self.morning_targets.get(key)
+            if target is not None:
+                target.sent_on = date.fromisoformat(sent_on)
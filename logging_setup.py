@@ -0,0 +1,108 @@
+"""Non-blocking structured logging.
+
+Log calls on the event loop only build a LogRecord and put it on a queue; a
+QueueListener thread formats records as JSON lines and writes them to stdout
+and a rotating file. Configure with environment variables:
+- LOG_LEVEL:        minimum level (default INFO)
+- LOG_FILE:         rotating log file path (default bot.log, empty to disable)
+- LOG_SAMPLE_EVERY: keep 1 in N INFO/DEBUG lines from high-volume loggers (default 10)"""
+import atexit
+import json
+import logging
+import os
+import queue
+import sys
+import time
+from collections import Counter
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+# Per-subsystem loggers: get_logger('antinuke') -> 'toxy.antinuke'
+ROOT_LOGGER = 'toxy'
+# Loggers that emit a line per message/join; their INFO/DEBUG lines are sampled
+SAMPLED_LOGGERS = ('toxy.welcome', 'toxy.spam')
+# Attributes every LogRecord has; anything else came from `extra=` and is emitted as a field
+_STANDARD_ATTRS = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime', 'taskName'}
+
+
+def get_logger(subsystem):
+    return logging.getLogger(f"{ROOT_LOGGER}.{subsystem}")
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: ts, level, logger, msg, extra fields and exc"""
+
+    def format(self, record):
+        entry = {
+            'ts': time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime(record.created)) + f".{int(record.msecs):03d}Z",
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _STANDARD_ATTRS and not key.startswith('_'):
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry['exc'] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class SamplingFilter(logging.Filter):
+    """Keeps 1 in `every` INFO/DEBUG records from the sampled loggers; warnings always pass"""
+
+    def __init__(self, every, loggers=SAMPLED_LOGGERS):
+        super().__init__()
+        self.every = max(1, every)
+        self.loggers = loggers
+        self.counts = Counter()
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING or not record.name.startswith(self.loggers):
+            return True
+        self.counts[record.name] += 1
+        if self.counts[record.name] % self.every != 1 % self.every:
+            return False
+        record.sampled = self.every
+        return True
+
+
+class EnqueueOnlyHandler(QueueHandler):
+    """QueueHandler that leaves formatting to the listener thread.
+
+    The stock prepare() formats the message in the calling thread; here only an
+    exception traceback is rendered eagerly (it can't safely cross threads)."""
+
+    def prepare(self, record):
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def setup_logging():
+    """Route all logging (ours and discord.py's) through a background writer thread"""
+    level = os.getenv('LOG_LEVEL', 'INFO').upper()
+    log_file = os.getenv('LOG_FILE', 'bot.log')
+    sample_every = int(os.getenv('LOG_SAMPLE_EVERY', '10'))
+
+    formatter = JsonFormatter()
+    handlers = [logging.StreamHandler(sys.stdout)]
+    if log_file:
+        handlers.append(RotatingFileHandler(log_file, maxBytes=10 * 1024 * 1024, backupCount=5,
+                                            encoding='utf-8'))
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    log_queue = queue.SimpleQueue()
+    queue_handler = EnqueueOnlyHandler(log_queue)
+    queue_handler.addFilter(SamplingFilter(sample_every))
+
+    root = logging.getLogger()
+    root.handlers[:] = [queue_handler]
+    root.setLevel(level)
+
+    listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)  # flush whatever is still queued on exit
+    return listener
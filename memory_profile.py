@@ -0,0 +1,122 @@
+"""Cache/chunking profiles for the bot and a startup measurement harness.
+
+Pick a profile with the BOT_MEMORY_PROFILE environment variable:
+- default:  cache every member, chunk all guilds at startup (discord.py defaults)
+- balanced: only cache members seen joining, no startup chunking, small message cache
+- low:      no member or message cache at all; members are fetched lazily when needed
+
+Run `python memory_profile.py` to start the bot once per profile and print the
+startup time and RSS of each (needs DISCORD_BOT_TOKEN)."""
+import os
+import subprocess
+import sys
+
+import discord
+
+from logging_setup import get_logger
+
+log = get_logger('core')
+
+PROFILES = {
+    'default': {
+        'member_cache': 'intents',
+        'chunk_guilds_at_startup': True,
+        'max_messages': 1000,
+    },
+    'balanced': {
+        'member_cache': 'joined',
+        'chunk_guilds_at_startup': False,
+        'max_messages': 200,
+    },
+    'low': {
+        'member_cache': 'none',
+        'chunk_guilds_at_startup': False,
+        'max_messages': None,
+    },
+}
+
+# Output line printed by `bot.py --measure-startup`, parsed by measure_all()
+REPORT_PREFIX = 'STARTUP_REPORT'
+
+
+def profile_name():
+    name = os.getenv('BOT_MEMORY_PROFILE', 'default').strip().lower()
+    if name not in PROFILES:
+        log.warning("Unknown BOT_MEMORY_PROFILE '%s', using 'default'", name)
+        name = 'default'
+    return name
+
+
+def bot_options(intents, name=None):
+    """Keyword arguments for commands.Bot implementing the selected profile"""
+    profile = PROFILES[name or profile_name()]
+    if profile['member_cache'] == 'none':
+        member_cache_flags = discord.MemberCacheFlags.none()
+    elif profile['member_cache'] == 'joined':
+        member_cache_flags = discord.MemberCacheFlags(voice=False, joined=True)
+    else:
+        member_cache_flags = discord.MemberCacheFlags.from_intents(intents)
+    return {
+        'member_cache_flags': member_cache_flags,
+        'chunk_guilds_at_startup': profile['chunk_guilds_at_startup'],
+        'max_messages': profile['max_messages'],
+    }
+
+
+async def get_or_fetch_member(guild, user_id):
+    """Return a guild member from cache, fetching it over REST if it isn't cached"""
+    member = guild.get_member(user_id)
+    if member is not None:
+        return member
+    try:
+        return await guild.fetch_member(user_id)
+    except discord.NotFound:
+        return None
+
+
+def current_rss_bytes():
+    """Resident set size of this process, or None if the platform doesn't expose it"""
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    try:
+        import resource
+    except ImportError:
+        return None
+    # Peak RSS: kilobytes on Linux, bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def startup_report(bot, name, elapsed):
+    """One-line summary of startup cost for the running bot"""
+    rss = current_rss_bytes()
+    rss_text = f"{rss / (1024 * 1024):.1f}MiB" if rss is not None else 'n/a'
+    members = sum(len(g.members) for g in bot.guilds)
+    return (f"{REPORT_PREFIX} profile={name} startup={elapsed:.2f}s rss={rss_text} "
+            f"guilds={len(bot.guilds)} cached_members={members}")
+
+
+def measure_all(timeout=600):
+    """Start the bot once per profile and print each startup report"""
+    bot_file = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'bot.py')
+    for name in PROFILES:
+        env = dict(os.environ, BOT_MEMORY_PROFILE=name)
+        try:
+            proc = subprocess.run([sys.executable, bot_file, '--measure-startup'], env=env,
+                                  capture_output=True, text=True, timeout=timeout)
+        except subprocess.TimeoutExpired:
+            print(f"{name}: timed out after {timeout}s")
+            continue
+        lines = [l for l in proc.stdout.splitlines() if l.startswith(REPORT_PREFIX)]
+        print(lines[-1] if lines else f"{name}: no report (exit code {proc.returncode})")
+
+
+if __name__ == '__main__':
+    if not os.getenv('DISCORD_BOT_TOKEN'):
+        sys.exit("DISCORD_BOT_TOKEN must be set to measure startup")
+    measure_all()
@@ -0,0 +1,193 @@
+import asyncio
+import time
+from collections import Counter, defaultdict, deque
+from dataclasses import dataclass
+from datetime import timedelta
+
+import discord
+
+from logging_setup import get_logger
+from ratelimit import call_with_retry
+
+log = get_logger('spam')
+
+
+def describe_error(e):
+    """'TimeoutError' or 'ClientOSError: [Errno 104] ...' for a non-HTTP failure"""
+    return f"{type(e).__name__}: {e}" if str(e) else type(e).__name__
+
+
+@dataclass(slots=True)
+class ActionResult:
+    """Outcome of a single moderation action"""
+    guild_id: int
+    user_id: int
+    action: str
+    status: str  # 'ok', 'deduped' or 'failed'
+    detail: str = ''
+    elapsed: float = 0.0
+    reason: str = ''
+
+
+class ModerationExecutor:
+    """Runs timeouts, warnings and deletes concurrently.
+
+    Actions are deduplicated per (guild, user, action) within a cooldown, and
+    deletes are buffered briefly per channel so a burst of spam turns into a
+    single bulk delete call instead of one request per message."""
+
+    # Seconds before the same action may hit the same user again
+    COOLDOWNS = {
+        'timeout': 60.0,
+        'warn': 15.0,
+    }
+
+    def __init__(self, max_concurrency=5, flush_delay=0.5, history=500, cooldowns=None):
+        self.flush_delay = flush_delay
+        self.cooldowns = dict(self.COOLDOWNS, **(cooldowns or {}))
+        self.stats = Counter()  # {'<action>.<status>': count}
+        self.results = deque(maxlen=history)  # most recent ActionResult objects
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._last_action = {}  # {(guild_id, user_id, action): monotonic time}
+        self._pending_deletes = defaultdict(dict)  # {channel_id: {message_id: message}}
+        self._flush_handles = {}  # {channel_id: asyncio.TimerHandle}
+        self._tasks = set()
+        self.listeners = []  # callables receiving every ActionResult (e.g. the audit log)
+
+    def punish(self, message, reason, warning, duration=timedelta(minutes=10)):
+        """Delete the message, then warn and time out its author in the background"""
+        self.delete(message, reason)
+        self._spawn(self.warn(message.channel, message.author, warning))
+        self._spawn(self.timeout(message.author, duration, reason))
+
+    def delete(self, message, reason=''):
+        """Queue a message for (bulk) deletion in its channel"""
+        channel_id = message.channel.id
+        self._pending_deletes[channel_id][message.id] = (message, reason)
+        if channel_id not in self._flush_handles:
+            loop = asyncio.get_running_loop()
+            self._flush_handles[channel_id] = loop.call_later(
+                self.flush_delay, lambda: self._spawn(self._flush_deletes(message.channel))
+            )
+
+    async def warn(self, channel, member, text):
+        """Post a warning mentioning the member, at most once per cooldown"""
+        guild_id = channel.guild.id if getattr(channel, 'guild', None) else 0
+        return await self._run(guild_id, member.id, 'warn',
+                               lambda: channel.send(f"{member.mention}, {text}"), text)
+
+    async def timeout(self, member, duration, reason):
+        """Time out a guild member, at most once per cooldown"""
+        if not isinstance(member, discord.Member):
+            return None  # DMs / users that left - nothing to time out
+        return await self._run(member.guild.id, member.id, 'timeout',
+                               lambda: member.timeout(duration, reason=reason), reason)
+
+    def dedupe_snapshot(self):
+        """Unexpired cooldowns as [guild_id, user_id, action, unix time], for snapshot.py"""
+        # Monotonic clocks don't survive a restart, so store wall-clock times
+        now_mono, now_wall = time.monotonic(), time.time()
+        return [
+            [guild_id, user_id, action, now_wall - (now_mono - last)]
+            for (guild_id, user_id, action), last in self._last_action.items()
+            if now_mono - last < self.cooldowns.get(action, 0.0)
+        ]
+
+    def restore_dedupe(self, entries):
+        """Restore dedupe_snapshot() output, skipping cooldowns that ran out in the meantime"""
+        now_mono, now_wall = time.monotonic(), time.time()
+        for guild_id, user_id, action, when in entries:
+            age = now_wall - when
+            if 0 <= age < self.cooldowns.get(action, 0.0):
+                self._last_action[(guild_id, user_id, action)] = now_mono - age
+
+    # ----- internals -----
+
+    def _spawn(self, coro):
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    def _claim(self, guild_id, user_id, action):
+        """Return True if the action may run now, recording it for dedupe"""
+        now = time.monotonic()
+        key = (guild_id, user_id, action)
+        cooldown = self.cooldowns.get(action, 0.0)
+        last = self._last_action.get(key)
+        if last is not None and now - last < cooldown:
+            return False
+        self._last_action[key] = now
+        # Drop expired entries once the map grows, so it stays bounded
+        if len(self._last_action) > 10000:
+            longest = max(self.cooldowns.values(), default=0.0)
+            self._last_action = {k: t for k, t in self._last_action.items() if now - t < longest}
+        return True
+
+    def _record(self, result):
+        self.results.append(result)
+        self.stats[f"{result.action}.{result.status}"] += 1
+        if result.status == 'failed':
+            log.warning("%s failed for user %s: %s", result.action, result.user_id, result.detail,
+                        extra={'guild_id': result.guild_id})
+        elif result.status == 'ok':
+            log.info("%s user %s", result.action, result.user_id, extra={'guild_id': result.guild_id})
+        for listener in self.listeners:
+            listener(result)
+        return result
+
+    async def _run(self, guild_id, user_id, action, factory, reason=''):
+        if not self._claim(guild_id, user_id, action):
+            return self._record(ActionResult(guild_id, user_id, action, 'deduped', reason=reason))
+
+        start = time.monotonic()
+        try:
+            async with self._semaphore:
+                await call_with_retry(factory)
+        except discord.Forbidden:
+            status, detail = 'failed', 'missing permissions'
+        except discord.HTTPException as e:
+            status, detail = 'failed', f"HTTP {e.status}: {e.text}"
+        except Exception as e:  # network errors, timeouts... still need a result
+            status, detail = 'failed', describe_error(e)
+        else:
+            status, detail = 'ok', ''
+        return self._record(ActionResult(guild_id, user_id, action, status, detail,
+                                         time.monotonic() - start, reason))
+
+    async def _flush_deletes(self, channel):
+        self._flush_handles.pop(channel.id, None)
+        pending = list(self._pending_deletes.pop(channel.id, {}).values())
+        if not pending:
+            return
+        messages = [message for message, _ in pending]
+        guild_id = channel.guild.id if getattr(channel, 'guild', None) else 0
+
+        # Spam was just sent, so everything is well inside the 14 day bulk delete window.
+        # Only guild channels support bulk delete; elsewhere (DMs) delete one at a time
+        step = 100 if hasattr(channel, 'delete_messages') else 1
+        for i in range(0, len(messages), step):
+            chunk = messages[i:i + step]
+            if len(chunk) == 1:
+                factory = chunk[0].delete
+            else:
+                factory = lambda chunk=chunk: channel.delete_messages(chunk)
+
+            start = time.monotonic()
+            try:
+                async with self._semaphore:
+                    await call_with_retry(factory)
+            except discord.NotFound:
+                status, detail = 'ok', 'already deleted'
+            except discord.Forbidden:
+                status, detail = 'failed', 'missing permissions'
+            except discord.HTTPException as e:
+                status, detail = 'failed', f"HTTP {e.status}: {e.text}"
+            except Exception as e:
+                status, detail = 'failed', describe_error(e)
+            else:
+                status, detail = 'ok', ''
+            elapsed = time.monotonic() - start
+            # One result per deleted message so the counters reflect real volume
+            for message, reason in pending[i:i + step]:
+                self._record(ActionResult(guild_id, message.author.id, 'delete', status, detail, elapsed, reason))
@@ -0,0 +1,114 @@
+"""Append-only moderation audit trail in SQLite.
+
+record() only puts a row on a queue; a writer thread inserts rows in batches
+(one transaction per batch). Lookups by guild + user + time are answered from
+the (guild_id, user_id, ts) index, so they stay fast with millions of rows."""
+import asyncio
+import queue
+import sqlite3
+import threading
+import time
+
+from logging_setup import get_logger
+
+log = get_logger('modlog')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS actions (
+    id INTEGER PRIMARY KEY,
+    ts REAL NOT NULL,
+    guild_id INTEGER NOT NULL,
+    user_id INTEGER,
+    moderator_id INTEGER,
+    action TEXT NOT NULL,
+    reason TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_actions_guild_user_ts ON actions (guild_id, user_id, ts);
+CREATE INDEX IF NOT EXISTS idx_actions_guild_ts ON actions (guild_id, ts);
+"""
+
+_STOP = object()
+
+
+class ModLog:
+    """Batched, append-only writer plus indexed queries"""
+
+    def __init__(self, path, batch_size=500, flush_interval=1.0):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue = queue.SimpleQueue()
+        self._thread = None
+        self._read_conn = None
+        self._read_lock = threading.Lock()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, check_same_thread=False)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        return conn
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._writer, name='modlog-writer', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """Flush everything queued so far and stop the writer thread"""
+        if self._thread is not None:
+            self._queue.put(_STOP)
+            self._thread.join()
+            self._thread = None
+
+    def record(self, guild_id, action, user_id=None, moderator_id=None, reason=None, ts=None):
+        """Queue one moderation action (safe to call from the event loop)"""
+        self._queue.put((ts or time.time(), guild_id, user_id, moderator_id, action, reason))
+
+    def _writer(self):
+        conn = self._connect()
+        conn.executescript(SCHEMA)
+        stopping = False
+        while not stopping:
+            item = self._queue.get()
+            batch = []
+            deadline = time.monotonic() + self.flush_interval
+            # Collect until the batch is full, the interval passes or we're told to stop
+            while True:
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+                if len(batch) >= self.batch_size:
+                    break
+                try:
+                    item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+            if batch:
+                try:
+                    with conn:
+                        conn.executemany(
+                            'INSERT INTO actions (ts, guild_id, user_id, moderator_id, action, reason) '
+                            'VALUES (?, ?, ?, ?, ?, ?)', batch
+                        )
+                except sqlite3.Error:
+                    log.exception("Failed to write %d modlog entries", len(batch))
+        conn.close()
+
+    def _query(self, guild_id, user_id, since, limit):
+        with self._read_lock:
+            if self._read_conn is None:
+                self._read_conn = self._connect()
+                self._read_conn.executescript(SCHEMA)
+            where = 'guild_id = ? AND user_id = ? AND ts >= ?'
+            params = (guild_id, user_id, since or 0)
+            rows = self._read_conn.execute(
+                f'SELECT ts, action, moderator_id, reason FROM actions WHERE {where} '
+                'ORDER BY ts DESC LIMIT ?', params + (limit,)
+            ).fetchall()
+            total = self._read_conn.execute(f'SELECT COUNT(*) FROM actions WHERE {where}', params).fetchone()[0]
+        return rows, total
+
+    async def query(self, guild_id, user_id, since=None, limit=15):
+        """Newest entries for a user in a guild (optionally since a unix time), plus the total count"""
+        return await asyncio.to_thread(self._query, guild_id, user_id, since, limit)
@@ -0,0 +1,141 @@
+"""Paginated embeds with buttons, for list-style commands.
+
+Listings are backed by a SortedIndex: a sorted list of keys built on first use
+and dropped when the underlying data changes, so it is not re-sorted per call.
+Prefix search is two bisects, and a page is rendered only when it is shown,
+so each interaction costs O(page size) no matter how long the listing is."""
+from bisect import bisect_left
+
+import discord
+
+PAGE_SIZE = 20
+FIELD_LIMIT = 1024  # max characters in an embed field value
+
+
+class SortedIndex:
+    """Sorted, cached view of a collection's keys"""
+    __slots__ = ('_source', '_keys')
+
+    def __init__(self, source):
+        self._source = source  # () -> iterable of string keys
+        self._keys = None
+
+    def invalidate(self):
+        """Call whenever the underlying collection changes"""
+        self._keys = None
+
+    def keys(self):
+        if self._keys is None:
+            self._keys = sorted(self._source())
+        return self._keys
+
+    def __len__(self):
+        return len(self.keys())
+
+    def prefix_range(self, prefix=''):
+        """(start, stop) slice bounds of the keys starting with `prefix`"""
+        keys = self.keys()
+        if not prefix:
+            return 0, len(keys)
+        start = bisect_left(keys, prefix)
+        # Smallest string greater than every string with this prefix
+        stop = bisect_left(keys, prefix[:-1] + chr(ord(prefix[-1]) + 1), start)
+        return start, stop
+
+
+def chunk_text(text, size=FIELD_LIMIT):
+    """Split text into pieces of at most `size` characters, preferring line breaks"""
+    chunks = []
+    while len(text) > size:
+        cut = text.rfind('\n', 0, size)
+        if cut <= 0:
+            cut = size
+        chunks.append(text[:cut])
+        text = text[cut:].lstrip('\n')
+    if text or not chunks:
+        chunks.append(text)
+    return chunks
+
+
+def add_long_field(embed, name, value, inline=False):
+    """Add a field, continuing into extra fields if the value is over the field limit"""
+    for i, chunk in enumerate(chunk_text(value)):
+        embed.add_field(name=name if i == 0 else f"{name} (cont.)", value=chunk or '\u200b', inline=inline)
+    return embed
+
+
+class Paginator(discord.ui.View):
+    """First/previous/next/last buttons over `count` items, rendered one page at a time.
+
+    `render(start, stop)` builds the embed for items start..stop-1; only the
+    member who ran the command can turn pages."""
+
+    def __init__(self, author_id, count, render, page_size=PAGE_SIZE, timeout=180):
+        super().__init__(timeout=timeout)
+        self.author_id = author_id
+        self.count = count
+        self.render = render
+        self.page_size = page_size
+        self.page = 0
+        self.message = None
+
+    @property
+    def page_count(self):
+        return max(1, -(-self.count // self.page_size))
+
+    def current_embed(self):
+        start = self.page * self.page_size
+        embed = self.render(start, min(start + self.page_size, self.count))
+        if self.page_count > 1:
+            embed.set_footer(text=f"Page {self.page + 1}/{self.page_count} • {self.count} entries")
+        self.first.disabled = self.previous.disabled = self.page == 0
+        self.next.disabled = self.last.disabled = self.page >= self.page_count - 1
+        self.position.label = f"{self.page + 1}/{self.page_count}"
+        return embed
+
+    async def send(self, ctx):
+        """Send the first page; single-page listings are sent without buttons"""
+        embed = self.current_embed()
+        if self.page_count == 1:
+            self.stop()
+            return await ctx.send(embed=embed)
+        self.message = await ctx.send(embed=embed, view=self)
+        return self.message
+
+    async def interaction_check(self, interaction):
+        if interaction.user.id != self.author_id:
+            await interaction.response.send_message("❌ Only the person who ran the command can change pages.",
+                                                    ephemeral=True)
+            return False
+        return True
+
+    async def on_timeout(self):
+        if self.message is not None:
+            try:
+                await self.message.edit(view=None)
+            except discord.HTTPException:
+                pass
+
+    async def _show(self, interaction, page):
+        self.page = max(0, min(page, self.page_count - 1))
+        await interaction.response.edit_message(embed=self.current_embed(), view=self)
+
+    @discord.ui.button(label='⏮', style=discord.ButtonStyle.secondary)
+    async def first(self, interaction, button):
+        await self._show(interaction, 0)
+
+    @discord.ui.button(label='◀', style=discord.ButtonStyle.primary)
+    async def previous(self, interaction, button):
+        await self._show(interaction, self.page - 1)
+
+    @discord.ui.button(label='1/1', style=discord.ButtonStyle.secondary, disabled=True)
+    async def position(self, interaction, button):
+        pass
+
+    @discord.ui.button(label='▶', style=discord.ButtonStyle.primary)
+    async def next(self, interaction, button):
+        await self._show(interaction, self.page + 1)
+
+    @discord.ui.button(label='⏭', style=discord.ButtonStyle.secondary)
+    async def last(self, interaction, button):
+        await self._show(interaction, self.page_count - 1)
@@ -0,0 +1,196 @@
+"""Streaming bulk purge used by !clear.
+
+Channel history is streamed page by page; matching messages younger than 14
+days are deleted in 100-message bulk calls while scanning continues, and older
+ones (which Discord won't bulk delete) fall back to concurrent single deletes."""
+import asyncio
+import re
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+
+import discord
+
+from durations import parse_duration
+from moderation import describe_error
+from ratelimit import call_with_retry, gather_limited
+
+BULK_DELETE_LIMIT = 100
+# Discord refuses bulk deletes of messages older than 14 days; keep a small margin
+BULK_DELETE_MAX_AGE = timedelta(days=14) - timedelta(minutes=1)
+# Default window for the `raiders` filter: accounts that joined within this long
+RAIDER_WINDOW = timedelta(minutes=30)
+# Seconds between progress message edits
+PROGRESS_INTERVAL = 2.0
+
+
+@dataclass(slots=True)
+class PurgeFilter:
+    """Which messages a purge should delete (every set criterion must match)"""
+    authors: frozenset = frozenset()
+    after: datetime | None = None
+    before: datetime | None = None
+    pattern: re.Pattern | None = None
+    joined_after: datetime | None = None  # `raiders`: authors who joined after this time
+
+    def is_empty(self):
+        return not self.authors and self.pattern is None and self.joined_after is None
+
+    def matches(self, message, joined_at=None):
+        """`joined_at` overrides the author's join time, for authors that aren't cached members"""
+        if self.authors and message.author.id not in self.authors:
+            return False
+        if self.pattern is not None and not self.pattern.search(message.content):
+            return False
+        if self.joined_after is not None:
+            if joined_at is None:
+                joined_at = getattr(message.author, 'joined_at', None)
+            if joined_at is None or joined_at < self.joined_after:
+                return False
+        return True
+
+    @classmethod
+    def parse(cls, tokens, mentions=()):
+        """Build a filter from command tokens.
+
+        Supported: @user / user ID, since:<duration>, until:<duration>,
+        regex:<pattern>, raiders[:<duration>]. Raises ValueError on bad input."""
+        now = datetime.now(timezone.utc)
+        authors = {m.id for m in mentions}
+        after = before = pattern = joined_after = None
+        for token in tokens:
+            key, _, value = token.partition(':')
+            key = key.lower()
+            if token.startswith('<@') or token.isdigit():
+                digits = token.strip('<@!>')
+                if not digits.isdigit():
+                    raise ValueError(f"Invalid user: {token}")
+                authors.add(int(digits))
+            elif key in ('since', 'until'):
+                delta = parse_duration(value)
+                if delta is None:
+                    raise ValueError(f"Invalid duration `{value}` (use e.g. 30m, 2h, 1d)")
+                if key == 'since':
+                    after = now - delta
+                else:
+                    before = now - delta
+            elif key == 'regex':
+                try:
+                    pattern = re.compile(value, re.IGNORECASE)
+                except re.error as e:
+                    raise ValueError(f"Invalid regex: {e}")
+            elif key == 'raiders':
+                delta = parse_duration(value) if value else RAIDER_WINDOW
+                if delta is None:
+                    raise ValueError(f"Invalid duration `{value}` (use e.g. 30m, 2h, 1d)")
+                joined_after = now - delta
+            else:
+                raise ValueError(f"Unknown filter `{token}`")
+        return cls(frozenset(authors), after, before, pattern, joined_after)
+
+
+@dataclass(slots=True)
+class PurgeResult:
+    scanned: int = 0
+    deleted: int = 0
+    failed: int = 0
+    errors: list = field(default_factory=list)
+
+
+async def purge_channel(channel, limit, purge_filter, before=None, scan_limit=None,
+                        progress=None, concurrency=5, resolve_member=None):
+    """Delete up to `limit` messages matching `purge_filter`, newest first.
+
+    `progress` is an optional coroutine function called with the PurgeResult
+    at most every PROGRESS_INTERVAL seconds while the purge runs.
+    `resolve_member(guild, user_id)` looks up members that aren't cached; history
+    messages only carry a join time for cached members, so `raiders` needs it."""
+    result = PurgeResult()
+    semaphore = asyncio.Semaphore(concurrency)
+    pending = set()  # in-flight delete tasks
+    bulk, old = [], []
+    bulk_cutoff = datetime.now(timezone.utc) - BULK_DELETE_MAX_AGE
+    last_progress = time.monotonic()
+
+    async def delete_bulk(chunk):
+        try:
+            async with semaphore:
+                if len(chunk) == 1:
+                    await call_with_retry(chunk[0].delete)
+                else:
+                    await call_with_retry(lambda: channel.delete_messages(chunk))
+            result.deleted += len(chunk)
+        except discord.NotFound:
+            result.deleted += len(chunk)  # someone else got there first
+        except discord.HTTPException as e:
+            result.failed += len(chunk)
+            result.errors.append(str(e))
+        except Exception as e:  # network errors, timeouts: count them, keep the purge going
+            result.failed += len(chunk)
+            result.errors.append(describe_error(e))
+
+    async def delete_old(chunk):
+        outcomes = await gather_limited([m.delete for m in chunk], concurrency)
+        for outcome in outcomes:
+            if isinstance(outcome, Exception) and not isinstance(outcome, discord.NotFound):
+                result.failed += 1
+                result.errors.append(str(outcome) if isinstance(outcome, discord.HTTPException)
+                                     else describe_error(outcome))
+            else:
+                result.deleted += 1
+
+    join_times = {}  # {author_id: joined_at or None}, one lookup per author
+
+    async def author_joined_at(author):
+        if author.id not in join_times:
+            joined_at = getattr(author, 'joined_at', None)
+            if joined_at is None and resolve_member is not None and getattr(channel, 'guild', None):
+                try:
+                    member = await resolve_member(channel.guild, author.id)
+                except discord.HTTPException:
+                    member = None
+                joined_at = member.joined_at if member is not None else None
+            join_times[author.id] = joined_at
+        return join_times[author.id]
+
+    def start(coro):
+        task = asyncio.create_task(coro)
+        pending.add(task)
+        task.add_done_callback(pending.discard)
+
+    # Newest first; `until:` always lies before the command message, so it wins as start point
+    history_before = purge_filter.before or before
+    matched = 0
+    async for message in channel.history(limit=scan_limit, before=history_before,
+                                         after=purge_filter.after, oldest_first=False):
+        result.scanned += 1
+        joined_at = None
+        if purge_filter.joined_after is not None:
+            joined_at = await author_joined_at(message.author)
+        if not purge_filter.matches(message, joined_at):
+            continue
+        matched += 1
+        if message.created_at >= bulk_cutoff:
+            bulk.append(message)
+            if len(bulk) == BULK_DELETE_LIMIT:
+                start(delete_bulk(bulk))
+                bulk = []
+        else:
+            old.append(message)
+            if len(old) == BULK_DELETE_LIMIT:
+                start(delete_old(old))
+                old = []
+
+        if progress is not None and time.monotonic() - last_progress >= PROGRESS_INTERVAL:
+            last_progress = time.monotonic()
+            await progress(result)
+        if matched >= limit:
+            break
+
+    if bulk:
+        start(delete_bulk(bulk))
+    if old:
+        start(delete_old(old))
+    while pending:
+        await asyncio.gather(*list(pending))
+    return result
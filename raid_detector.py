@@ -0,0 +1,212 @@
+"""Adaptive raid detection from per-guild join-rate history.
+
+Each guild keeps a fixed-size ring buffer of per-minute join counts and an
+online baseline (EWMA of joins per minute plus its variance). A raid is flagged
+when the current minute's joins exceed baseline + Z standard deviations, with
+a floor so quiet servers still need a handful of joins.
+
+Until the baseline has enough history, bursts are judged instead: the joins
+of the last 10 seconds count as a raid if a steady rate like the one seen since
+the first join (measured over at least half a minute) would almost never
+produce them, and they are at least the 5 of the old fixed rule. Work per join
+is bounded and memory per guild is fixed."""
+import base64
+import math
+import time
+from array import array
+from collections import deque
+from dataclasses import dataclass
+
+HISTORY_MINUTES = 60  # ring buffer length
+EWMA_ALPHA = 0.05  # weight of the newest minute (~20 minute memory)
+Z_THRESHOLD = 4.0  # standard deviations above baseline that count as a raid
+MIN_RAID_JOINS = 3  # never flag fewer joins than this in one minute
+WARMUP_MINUTES = 30  # until the baseline has this much history, look for bursts:
+BURST_SECONDS = 10  # joins within this many seconds...
+WARMUP_BURST_JOINS = 5  # ...at least this many (the old fixed rule)...
+BURST_TAIL_PROBABILITY = 1e-5  # ...and less likely than this at the rate seen so far
+BURST_MIN_SECONDS = 30  # observe the rate this long before judging bursts
+RECENT_JOINS = 128  # join times kept for the burst window
+
+
+@dataclass(slots=True)
+class RaidAlert:
+    guild_id: int
+    joins: int  # joins in the current minute
+    threshold: int
+    baseline: float  # EWMA joins per minute
+    stddev: float
+
+
+class JoinRate:
+    """Join history and baseline for one guild"""
+    __slots__ = ('buckets', 'minute', 'mean', 'var', 'samples', 'alerted_minute', 'partial', 'recent',
+                 'since', 'seen')
+
+    def __init__(self, minute, partial=True):
+        self.buckets = array('I', bytes(4 * HISTORY_MINUTES))  # joins per minute, ring buffer
+        self.minute = minute  # epoch minute of the current bucket
+        self.mean = 0.0
+        self.var = 0.0
+        self.samples = 0  # completed minutes folded into the baseline
+        self.alerted_minute = -1
+        self.partial = partial  # the current minute wasn't observed from its start
+        self.recent = deque(maxlen=RECENT_JOINS)  # join times in the burst window, during warmup
+        self.since = None  # time of the first join seen during warmup
+        self.seen = 0  # joins since then
+
+    def warmed_up(self):
+        return self.samples >= WARMUP_MINUTES
+
+    def burst(self, now):
+        """Record a join at `now`; returns the number of joins within the last BURST_SECONDS"""
+        recent = self.recent
+        recent.append(now)
+        while now - recent[0] > BURST_SECONDS:
+            recent.popleft()
+        return len(recent)
+
+    def burst_threshold(self, now):
+        """Joins within BURST_SECONDS that stand out against the rate seen so far, or None.
+
+        Only joins before the current window count towards that rate, so a burst
+        can't raise its own bar."""
+        observed = now - BURST_SECONDS - self.since
+        if observed < BURST_MIN_SECONDS:
+            return None
+        before = self.seen - len(self.recent)
+        # Early on the rate rests on a few joins, so assume two standard errors more
+        expected = (before + 2 * math.sqrt(before)) * BURST_SECONDS / observed
+        # Smallest count whose Poisson tail is below BURST_TAIL_PROBABILITY (a normal
+        # approximation is far too optimistic for a handful of expected joins)
+        term = cdf = math.exp(-expected)
+        joins = 0
+        while 1 - cdf > BURST_TAIL_PROBABILITY and joins < RECENT_JOINS:
+            joins += 1
+            term *= expected / joins
+            cdf += term
+        return max(WARMUP_BURST_JOINS, joins + 1)
+
+    def threshold(self):
+        return max(MIN_RAID_JOINS, math.ceil(self.mean + Z_THRESHOLD * math.sqrt(self.var)))
+
+    def _close_minute(self, count):
+        if self.partial:
+            # The first minute was only seen from the first join on; it would seed too low
+            self.partial = False
+            return
+        if self.samples == 0:
+            # Seed from the first full minute (join counts are roughly Poisson: variance ~ mean)
+            self.mean = self.var = float(count)
+            self.samples = 1
+            return
+        # Don't let a raid minute inflate the baseline it was measured against
+        # (while warming up every minute counts, so big servers can learn their rate)
+        if self.warmed_up():
+            count = min(count, self.threshold())
+        diff = count - self.mean
+        increment = EWMA_ALPHA * diff
+        self.mean += increment
+        self.var = (1 - EWMA_ALPHA) * (self.var + diff * increment)
+        self.samples += 1
+
+    def advance(self, minute):
+        """Roll the ring buffer forward to `minute`, folding finished minutes into the baseline"""
+        if minute <= self.minute:
+            return
+        gap = minute - self.minute
+        self._close_minute(self.buckets[self.minute % HISTORY_MINUTES])
+        # Minutes without joins count as zero; past the buffer length the baseline
+        # has decayed to ~0 anyway, so the loop stays bounded
+        idle = gap - 1
+        for _ in range(min(idle, HISTORY_MINUTES)):
+            self._close_minute(0)
+        self.samples += max(0, idle - HISTORY_MINUTES)
+        for m in range(self.minute + 1, self.minute + 1 + min(gap, HISTORY_MINUTES)):
+            self.buckets[m % HISTORY_MINUTES] = 0
+        self.minute = minute
+
+    def history(self):
+        """Join counts for the last HISTORY_MINUTES minutes, oldest first"""
+        start = self.minute + 1
+        return [self.buckets[m % HISTORY_MINUTES] for m in range(start, start + HISTORY_MINUTES)]
+
+
+class RaidDetector:
+    """Tracks join rates for every guild and flags anomalous spikes"""
+
+    def __init__(self):
+        self.guilds = {}  # {guild_id: JoinRate}
+
+    def _rate(self, guild_id, minute):
+        rate = self.guilds.get(guild_id)
+        if rate is None:
+            rate = self.guilds[guild_id] = JoinRate(minute)
+        rate.advance(minute)
+        return rate
+
+    def record_join(self, guild_id, now=None):
+        """Count a join; returns a RaidAlert the first time a minute crosses the threshold"""
+        now = time.time() if now is None else now
+        minute = int(now // 60)
+        rate = self._rate(guild_id, minute)
+        index = minute % HISTORY_MINUTES
+        rate.buckets[index] += 1
+        joins = rate.buckets[index]
+        threshold = rate.threshold()
+        if rate.warmed_up():
+            rate.recent.clear()
+            raid = joins >= threshold
+        else:
+            # Young baseline: compare the burst with the rate seen since the first join
+            if rate.since is None:
+                rate.since = now
+            rate.seen += 1
+            burst = rate.burst(now)
+            burst_threshold = rate.burst_threshold(now)
+            raid = burst_threshold is not None and burst >= burst_threshold
+            if raid:
+                threshold = burst_threshold
+                joins = max(joins, burst)  # the burst may straddle a minute boundary
+        if raid and rate.alerted_minute != minute:
+            rate.alerted_minute = minute
+            return RaidAlert(guild_id, joins, threshold, rate.mean, math.sqrt(rate.var))
+        return None
+
+    def stats(self, guild_id, now=None):
+        """(history, baseline, stddev, threshold) for a guild, or None if no joins seen"""
+        rate = self.guilds.get(guild_id)
+        if rate is None:
+            return None
+        rate.advance(int((time.time() if now is None else now) // 60))
+        return rate.history(), rate.mean, math.sqrt(rate.var), rate.threshold()
+
+    def forget_guild(self, guild_id):
+        self.guilds.pop(guild_id, None)
+
+    def snapshot(self):
+        """Ring buffers and baselines for snapshot.py"""
+        return {
+            str(guild_id): [rate.minute, rate.mean, rate.var, rate.samples, rate.alerted_minute,
+                            base64.b64encode(rate.buckets.tobytes()).decode('ascii')]
+            for guild_id, rate in self.guilds.items()
+        }
+
+    def restore(self, data):
+        """Restore snapshot() output; idle minutes since then are folded in on the next join"""
+        for key, (minute, mean, var, samples, alerted_minute, buckets) in data.items():
+            rate = JoinRate(minute, partial=False)
+            raw = base64.b64decode(buckets)
+            if len(raw) == len(rate.buckets) * rate.buckets.itemsize:
+                rate.buckets = array('I', raw)
+            rate.mean, rate.var, rate.samples, rate.alerted_minute = mean, var, samples, alerted_minute
+            self.guilds[int(key)] = rate
+
+
+def sparkline(values):
+    """Render counts as a one-line bar chart"""
+    bars = '▁▂▃▄▅▆▇█'
+    peak = max(values, default=0)
+    if peak == 0:
+        return bars[0] * len(values)
+    return ''.join(bars[min(len(bars) - 1, v * len(bars) // (peak + 1))] for v in values)
@@ -0,0 +1,53 @@
+import asyncio
+import time
+import discord
+
+
+async def call_with_retry(factory, attempts=3):
+    """Await factory(), retrying when Discord answers 429 or a transient 5xx"""
+    for attempt in range(attempts):
+        try:
+            return await factory()
+        except discord.HTTPException as e:
+            retryable = e.status == 429 or e.status >= 500
+            if not retryable or attempt == attempts - 1:
+                raise
+            # discord.py already sleeps through normal bucket limits, so a 429
+            # reaching us means a shared/global limit - back off before retrying
+            retry_after = getattr(e, 'retry_after', None) or 2 ** attempt
+            await asyncio.sleep(retry_after)
+
+
+async def gather_limited(factories, limit=5):
+    """Run coroutine factories concurrently, at most `limit` in flight at once.
+
+    Returns results in the same order, with exceptions in place of failed calls."""
+    semaphore = asyncio.Semaphore(limit)
+
+    async def run(factory):
+        async with semaphore:
+            return await call_with_retry(factory)
+
+    return await asyncio.gather(*(run(f) for f in factories), return_exceptions=True)
+
+
+class TokenBucket:
+    """Simple token bucket: allows `rate` acquisitions per second, bursting to `capacity`"""
+
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity or rate
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
@@ -0,0 +1,197 @@
+"""Opt-in profiler for outbound Discord REST calls.
+
+Enable with REST_PROFILE=1. Every request made through discord.py's HTTP client
+(and raw aiohttp sessions created with trace_configs()) is recorded per
+(source, route), where the source is the event, command or background task that
+caused it. For each call we split the total time into time on the wire and time
+spent waiting: on discord.py's rate limit buckets, or sleeping after a 429."""
+import contextvars
+import os
+import re
+import time
+from collections import deque
+
+from logging_setup import get_logger
+
+log = get_logger('rest')
+
+# What caused the current REST call: 'event:message', 'command:clear', 'task:bump_task', ...
+current_source = contextvars.ContextVar('rest_source', default='other')
+# Per-call accumulator [network seconds, 429 responses] while inside HTTPClient.request
+_current_call = contextvars.ContextVar('rest_call', default=None)
+
+RECENT_SAMPLES = 256  # latencies kept per (source, route) for percentiles
+_SNOWFLAKE = re.compile(r'/\d{15,22}(?=/|$)')
+
+
+def route_template(method, path):
+    """'GET /guilds/123.../commands' -> 'GET /guilds/{id}/commands' for raw aiohttp calls"""
+    return f"{method} {_SNOWFLAKE.sub('/{id}', path)}"
+
+
+class RouteStats:
+    __slots__ = ('calls', 'errors', 'rate_limited', 'total', 'network', 'max', 'recent')
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.rate_limited = 0  # 429 responses (discord.py retries these for us)
+        self.total = 0.0
+        self.network = 0.0
+        self.max = 0.0
+        self.recent = deque(maxlen=RECENT_SAMPLES)
+
+
+class RestProfiler:
+    """Collects per-(source, route) latency and rate limit counters"""
+
+    def __init__(self, enabled):
+        self.enabled = enabled
+        self.started = time.time()
+        self.stats = {}  # {(source, route): RouteStats}
+
+    def reset(self):
+        self.started = time.time()
+        self.stats = {}
+
+    def record(self, source, route, elapsed, network, rate_limited=0, failed=False):
+        stats = self.stats.get((source, route))
+        if stats is None:
+            stats = self.stats[(source, route)] = RouteStats()
+        stats.calls += 1
+        stats.errors += failed
+        stats.rate_limited += rate_limited
+        stats.total += elapsed
+        stats.network += network
+        stats.max = max(stats.max, elapsed)
+        stats.recent.append(elapsed)
+
+    # ----- hooks -----
+
+    def trace_config(self):
+        """aiohttp TraceConfig measuring network time and 429s, or None when disabled"""
+        if not self.enabled:
+            return None
+        import aiohttp
+
+        async def on_request_start(session, ctx, params):
+            ctx.start = time.perf_counter()
+
+        async def on_request_end(session, ctx, params):
+            self._request_done(ctx, params.method, params.url, params.response.status)
+
+        async def on_request_exception(session, ctx, params):
+            self._request_done(ctx, params.method, params.url, None)
+
+        trace = aiohttp.TraceConfig()
+        trace.on_request_start.append(on_request_start)
+        trace.on_request_end.append(on_request_end)
+        trace.on_request_exception.append(on_request_exception)
+        return trace
+
+    def trace_configs(self):
+        """trace_configs argument for raw aiohttp.ClientSession()s"""
+        trace = self.trace_config()
+        return [trace] if trace else []
+
+    def _request_done(self, ctx, method, url, status):
+        network = time.perf_counter() - ctx.start
+        call = _current_call.get()
+        if call is not None:
+            # Inside HTTPClient.request: add to that call's totals
+            call[0] += network
+            call[1] += status == 429
+        else:
+            # Raw aiohttp call: no bucket waits, the wire time is the whole call
+            failed = status is None or status >= 400
+            self.record(current_source.get(), route_template(method, url.path), network, network,
+                        int(status == 429), failed)
+
+    def install(self, bot):
+        """Wrap the bot's HTTP client, and tag events and commands as call sources"""
+        if not self.enabled:
+            return
+        http = bot.http
+        request = http.request
+
+        async def profiled_request(route, **kwargs):
+            call = [0.0, 0]
+            token = _current_call.set(call)
+            start = time.perf_counter()
+            failed = True
+            try:
+                result = await request(route, **kwargs)
+                failed = False
+                return result
+            finally:
+                _current_call.reset(token)
+                self.record(current_source.get(), f"{route.method} {route.path}",
+                            time.perf_counter() - start, call[0], call[1], failed)
+
+        http.request = profiled_request
+
+        # Each event handler runs in its own task, so setting the source there
+        # covers everything it awaits and every task it spawns
+        run_event = bot._run_event
+
+        async def profiled_run_event(coro, event_name, *args, **kwargs):
+            current_source.set(f"event:{event_name.removeprefix('on_')}")
+            await run_event(coro, event_name, *args, **kwargs)
+
+        bot._run_event = profiled_run_event
+
+        @bot.before_invoke
+        async def tag_command(ctx):
+            current_source.set(f"command:{ctx.command.qualified_name}")
+
+        log.info("REST profiling enabled")
+
+    # ----- reporting -----
+
+    def report(self, group=None, sort='total_ms', limit=None):
+        """Rows ranked by `sort`, one per (source, route) or aggregated by 'source'/'route'"""
+        merged = {}
+        for (source, route), stats in list(self.stats.items()):
+            key = source if group == 'source' else route if group == 'route' else f"{source} {route}"
+            row = merged.get(key)
+            if row is None:
+                row = merged[key] = {'key': key, 'calls': 0, 'errors': 0, 'rate_limited': 0,
+                                     'total': 0.0, 'network': 0.0, 'max': 0.0, 'samples': []}
+            row['calls'] += stats.calls
+            row['errors'] += stats.errors
+            row['rate_limited'] += stats.rate_limited
+            row['total'] += stats.total
+            row['network'] += stats.network
+            row['max'] = max(row['max'], stats.max)
+            row['samples'].extend(stats.recent)
+
+        rows = []
+        for row in merged.values():
+            samples = sorted(row.pop('samples'))
+            p95 = samples[min(len(samples) - 1, int(len(samples) * 0.95))] if samples else 0.0
+            rows.append({
+                'key': row['key'],
+                'calls': row['calls'],
+                'errors': row['errors'],
+                'rate_limited': row['rate_limited'],
+                'total_ms': round(row['total'] * 1000, 1),
+                'avg_ms': round(row['total'] * 1000 / row['calls'], 1),
+                'p95_ms': round(p95 * 1000, 1),
+                'max_ms': round(row['max'] * 1000, 1),
+                'network_ms': round(row['network'] * 1000, 1),
+                'wait_ms': round(max(0.0, row['total'] - row['network']) * 1000, 1),
+            })
+        rows.sort(key=lambda r: r.get(sort, 0), reverse=True)
+        return rows[:limit] if limit else rows
+
+
+profiler = RestProfiler(os.getenv('REST_PROFILE', '').strip().lower() in ('1', 'true', 'yes'))
+
+
+def start_loop(loop):
+    """Start a tasks.loop with the REST calls it makes attributed to it"""
+    token = current_source.set(f"task:{loop.coro.__name__}")
+    try:
+        return loop.start()
+    finally:
+        current_source.reset(token)
@@ -0,0 +1,128 @@
+"""Hot reload of settings files edited outside the bot.
+
+Files are polled by mtime/size (a cheap stat per poll). When one changes it is
+reparsed and diffed in a worker thread, and the new state is swapped in on the
+event loop in a single synchronous step, so handlers never see a half-applied
+reload."""
+import asyncio
+import json
+import os
+import time
+
+from logging_setup import get_logger
+
+log = get_logger('settings')
+
+
+def stat_key(path):
+    """(mtime_ns, size) of a file, or None if it doesn't exist"""
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+def diff_dicts(old, new):
+    """Keys (added, removed, changed) between two flat dicts"""
+    added = [k for k in new if k not in old]
+    removed = [k for k in old if k not in new]
+    changed = [k for k in new if k in old and old[k] != new[k]]
+    return added, removed, changed
+
+
+def describe_diff(old, new):
+    """Short '+added -removed ~changed' summary of two settings objects ('' if equal).
+
+    Objects whose values are all dicts (like morning_settings.json) are compared
+    section by section."""
+    values = list(old.values()) + list(new.values())
+    if values and all(isinstance(v, dict) for v in values):
+        pairs = [(old.get(section, {}), new.get(section, {})) for section in old.keys() | new.keys()]
+    else:
+        pairs = [(old, new)]
+    added = removed = changed = 0
+    for old_section, new_section in pairs:
+        a, r, c = diff_dicts(old_section, new_section)
+        added, removed, changed = added + len(a), removed + len(r), changed + len(c)
+    if not (added or removed or changed):
+        return ''
+    return f"+{added} -{removed} ~{changed}"
+
+
+def write_json_atomic(path, data):
+    """Write JSON via a temp file + rename, so readers never see a partial file"""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f, indent=4)
+    os.replace(tmp_path, path)
+
+
+class WatchedFile:
+    __slots__ = ('path', 'snapshot', 'apply', 'parse', 'stat')
+
+    def __init__(self, path, snapshot, apply, parse=None):
+        self.path = path
+        self.snapshot = snapshot  # () -> current state in file layout (called on the loop)
+        self.apply = apply  # (parsed) -> None, swaps the new state in (called on the loop)
+        self.parse = parse  # (JSON data) -> parsed, validates/builds; raises ValueError (worker thread)
+        self.stat = stat_key(path)
+
+
+class SettingsWatcher:
+    """Reloads JSON settings files when they change on disk"""
+
+    def __init__(self):
+        self.files = {}  # {path: WatchedFile}
+
+    def watch(self, path, snapshot, apply, parse=None):
+        self.files[path] = WatchedFile(path, snapshot, apply, parse)
+
+    def remember(self, path):
+        """Record the file's current state, e.g. after the bot saved it itself"""
+        watched = self.files.get(path)
+        if watched is not None:
+            watched.stat = stat_key(path)
+
+    async def check(self):
+        """Reload every watched file that changed since the last check"""
+        for watched in self.files.values():
+            current = stat_key(watched.path)
+            if current is None or current == watched.stat:
+                continue  # unchanged, or deleted (keep the settings we have)
+            watched.stat = current
+            await self._reload(watched, current)
+
+    async def _reload(self, watched, current):
+        start = time.perf_counter()
+        old = watched.snapshot()
+
+        def parse_and_diff():
+            # Everything that can fail happens here, before any live state is touched
+            with open(watched.path, 'r') as f:
+                new = json.load(f)
+            if not isinstance(new, dict):
+                raise ValueError("expected a JSON object")
+            parsed = watched.parse(new) if watched.parse else new
+            return parsed, describe_diff(old, new)
+
+        try:
+            parsed, summary = await asyncio.to_thread(parse_and_diff)
+        except (OSError, ValueError) as e:
+            # Probably caught mid-write by an editor, or a bad edit; the next change will retry
+            log.warning("Could not reload %s: %s", watched.path, e)
+            return
+        except Exception:
+            log.exception("Could not reload %s", watched.path)
+            return
+        if not summary:
+            return
+        if stat_key(watched.path) != current:
+            return  # rewritten while we parsed (possibly by the bot itself); next check decides
+        try:
+            watched.apply(parsed)
+        except Exception:
+            # apply only swaps in prepared state, but never let it stop the poll loop
+            log.exception("Could not apply reloaded %s", watched.path)
+            return
+        log.info("Reloaded %s (%s) in %.1fms", watched.path, summary, (time.perf_counter() - start) * 1000)
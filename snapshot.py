@@ -0,0 +1,90 @@
+"""Warm-restart snapshots of volatile runtime state.
+
+A snapshot is a small binary file: a fixed header (magic, format version,
+write time, CRC32 of the body) followed by zlib-compressed JSON holding one
+section per subsystem. Each subsystem serializes and restores its own section;
+this module only handles the container, atomic writes and staleness checks."""
+import json
+import os
+import struct
+import threading
+import time
+import zlib
+
+from logging_setup import get_logger
+
+log = get_logger('snapshot')
+
+MAGIC = b'TOXY'
+VERSION = 1
+HEADER = struct.Struct('<4sHdI')  # magic, version, written_at (unix time), crc32 of body
+
+_write_lock = threading.Lock()  # periodic and on-demand saves can overlap
+
+
+def encode(sections, written_at=None):
+    """Serialize {section: JSON-compatible data} into snapshot bytes"""
+    body = zlib.compress(json.dumps(sections, separators=(',', ':')).encode('utf-8'), 6)
+    written_at = time.time() if written_at is None else written_at
+    return HEADER.pack(MAGIC, VERSION, written_at, zlib.crc32(body)) + body
+
+
+def decode(blob):
+    """(written_at, sections) from snapshot bytes; raises ValueError if they are unusable"""
+    if len(blob) < HEADER.size:
+        raise ValueError("truncated header")
+    magic, version, written_at, crc = HEADER.unpack_from(blob)
+    if magic != MAGIC:
+        raise ValueError("not a snapshot file")
+    if version != VERSION:
+        raise ValueError(f"unsupported snapshot version {version}")
+    body = blob[HEADER.size:]
+    if zlib.crc32(body) != crc:
+        raise ValueError("checksum mismatch")
+    try:
+        sections = json.loads(zlib.decompress(body))
+    except (zlib.error, ValueError) as e:
+        raise ValueError(f"corrupt body: {e}") from None
+    if not isinstance(sections, dict):
+        raise ValueError("corrupt body: expected an object")
+    return written_at, sections
+
+
+def save_snapshot(path, sections):
+    """Write a snapshot via a temp file + rename; returns its size in bytes"""
+    blob = encode(sections)
+    with _write_lock:
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(blob)
+        os.replace(tmp_path, path)
+    return len(blob)
+
+
+def load_snapshot(path, max_age):
+    """Sections of the snapshot at `path`, or None if it is missing, unreadable or stale"""
+    try:
+        with open(path, 'rb') as f:
+            blob = f.read()
+    except FileNotFoundError:
+        return None
+    except OSError:
+        log.exception("Could not read snapshot %s", path)
+        return None
+
+    try:
+        written_at, sections = decode(blob)
+    except ValueError as e:
+        log.warning("Ignoring snapshot %s: %s", path, e)
+        return None
+
+    age = time.time() - written_at
+    if age > max_age:
+        log.info("Ignoring snapshot %s: %.0fs old (max %ds)", path, age, max_age)
+        return None
+    if age < -60:
+        log.warning("Ignoring snapshot %s: written %.0fs in the future", path, -age)
+        return None
+    log.info("Loaded snapshot %s (%d bytes, %.0fs old)", path, len(blob), age,
+             extra={'sections': sorted(sections)})
+    return sections
@@ -0,0 +1,42 @@
+import time
+from contextlib import asynccontextmanager, contextmanager
+
+
+class StartupTimer:
+    """Collects per-phase durations from process start until the bot is ready"""
+
+    def __init__(self, started=None):
+        self.started = started if started is not None else time.monotonic()
+        self.phases = {}  # {phase name: seconds}, in the order they finished
+        self.reported = False
+
+    def record(self, name, seconds):
+        self.phases[name] = seconds
+
+    def since_start(self, name):
+        """Record a phase spanning from process start until now"""
+        self.record(name, time.monotonic() - self.started)
+
+    @contextmanager
+    def phase(self, name):
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self.record(name, time.monotonic() - start)
+
+    @asynccontextmanager
+    async def async_phase(self, name):
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self.record(name, time.monotonic() - start)
+
+    def elapsed(self):
+        return time.monotonic() - self.started
+
+    def report(self):
+        parts = [f"{name}={seconds:.3f}s" for name, seconds in self.phases.items()]
+        parts.append(f"total={self.elapsed():.3f}s")
+        return "⏱️  Startup: " + " ".join(parts)
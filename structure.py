@@ -0,0 +1,258 @@
+"""Compact snapshot of each guild's channel and role layout, for anti-nuke recovery.
+
+The snapshot is built from the gateway's own guild data and kept current from
+channel/role events, so it never needs a full REST fetch. Deleted channels and
+roles are kept for a while so `!restore` can recreate them."""
+import time
+from dataclasses import dataclass
+
+import discord
+
+from ratelimit import gather_limited
+
+# How long deleted channels/roles stay restorable (seconds)
+KEEP_DELETED = 24 * 60 * 60
+
+
+@dataclass(slots=True)
+class OverwriteRecord:
+    target_id: int
+    is_role: bool
+    allow: int
+    deny: int
+
+
+@dataclass(slots=True)
+class ChannelRecord:
+    id: int
+    name: str
+    kind: int  # discord.ChannelType value
+    position: int
+    category_id: int | None
+    overwrites: tuple  # of OverwriteRecord
+    topic: str | None = None
+    nsfw: bool = False
+    slowmode_delay: int = 0
+    bitrate: int | None = None
+    user_limit: int | None = None
+
+    @classmethod
+    def from_channel(cls, channel):
+        overwrites = []
+        for target, overwrite in channel.overwrites.items():
+            allow, deny = overwrite.pair()
+            is_role = isinstance(target, discord.Role) or getattr(target, 'type', None) is discord.Role
+            overwrites.append(OverwriteRecord(target.id, is_role, allow.value, deny.value))
+        return cls(
+            id=channel.id,
+            name=channel.name,
+            kind=channel.type.value,
+            position=channel.position,
+            category_id=channel.category_id,
+            overwrites=tuple(overwrites),
+            topic=getattr(channel, 'topic', None),
+            nsfw=bool(getattr(channel, 'nsfw', False)),
+            slowmode_delay=getattr(channel, 'slowmode_delay', 0) or 0,
+            bitrate=getattr(channel, 'bitrate', None),
+            user_limit=getattr(channel, 'user_limit', None),
+        )
+
+
+@dataclass(slots=True)
+class RoleRecord:
+    id: int
+    name: str
+    permissions: int
+    colour: int
+    hoist: bool
+    mentionable: bool
+    position: int
+
+    @classmethod
+    def from_role(cls, role):
+        return cls(role.id, role.name, role.permissions.value, role.colour.value,
+                   role.hoist, role.mentionable, role.position)
+
+
+class GuildStructure:
+    """Live channels/roles of one guild, plus recently deleted ones"""
+    __slots__ = ('channels', 'roles', 'deleted_channels', 'deleted_roles')
+
+    def __init__(self):
+        self.channels = {}  # {channel_id: ChannelRecord}
+        self.roles = {}  # {role_id: RoleRecord}
+        self.deleted_channels = {}  # {channel_id: (ChannelRecord, deleted_at)}
+        self.deleted_roles = {}  # {role_id: (RoleRecord, deleted_at)}
+
+    def prune(self, now):
+        for deleted in (self.deleted_channels, self.deleted_roles):
+            for key in [k for k, (_, at) in deleted.items() if now - at > KEEP_DELETED]:
+                del deleted[key]
+
+
+def _is_restorable_role(role):
+    # @everyone and integration/bot roles can't be recreated by us
+    return not role.is_default() and not role.managed
+
+
+class StructureTracker:
+    """Keeps a GuildStructure per guild up to date from gateway events"""
+
+    def __init__(self):
+        self.guilds = {}  # {guild_id: GuildStructure}
+
+    def sync_guild(self, guild):
+        """(Re)build a guild's snapshot from the gateway cache, keeping deletion history"""
+        structure = self.guilds.get(guild.id) or GuildStructure()
+        structure.channels = {c.id: ChannelRecord.from_channel(c) for c in guild.channels}
+        structure.roles = {r.id: RoleRecord.from_role(r) for r in guild.roles if _is_restorable_role(r)}
+        self.guilds[guild.id] = structure
+
+    def forget_guild(self, guild_id):
+        self.guilds.pop(guild_id, None)
+
+    def _structure(self, guild):
+        structure = self.guilds.get(guild.id)
+        if structure is None:
+            self.sync_guild(guild)
+            structure = self.guilds[guild.id]
+        return structure
+
+    def channel_changed(self, channel):
+        structure = self._structure(channel.guild)
+        structure.channels[channel.id] = ChannelRecord.from_channel(channel)
+        structure.deleted_channels.pop(channel.id, None)
+
+    def channel_deleted(self, channel):
+        structure = self._structure(channel.guild)
+        now = time.time()
+        record = structure.channels.pop(channel.id, None) or ChannelRecord.from_channel(channel)
+        structure.deleted_channels[channel.id] = (record, now)
+        structure.prune(now)
+
+    def role_changed(self, role):
+        if not _is_restorable_role(role):
+            return
+        structure = self._structure(role.guild)
+        structure.roles[role.id] = RoleRecord.from_role(role)
+        structure.deleted_roles.pop(role.id, None)
+
+    def role_deleted(self, role):
+        if not _is_restorable_role(role):
+            return
+        structure = self._structure(role.guild)
+        now = time.time()
+        record = structure.roles.pop(role.id, None) or RoleRecord.from_role(role)
+        structure.deleted_roles[role.id] = (record, now)
+        structure.prune(now)
+
+    def forget_deleted(self, guild_id, ids):
+        """Drop deletion records (e.g. once they've been restored)"""
+        structure = self.guilds.get(guild_id)
+        if structure is not None:
+            for key in ids:
+                structure.deleted_channels.pop(key, None)
+                structure.deleted_roles.pop(key, None)
+
+    def deleted_since(self, guild_id, since):
+        """Deleted (channels, roles) records for a guild, deleted at or after `since`"""
+        structure = self.guilds.get(guild_id)
+        if structure is None:
+            return [], []
+        channels = [record for record, at in structure.deleted_channels.values() if at >= since]
+        roles = [record for record, at in structure.deleted_roles.values() if at >= since]
+        return channels, roles
+
+
+def _build_overwrites(guild, records, role_map):
+    """Turn OverwriteRecords into a discord.py overwrites mapping, remapping restored roles"""
+    overwrites = {}
+    for record in records:
+        if record.is_role:
+            target = role_map.get(record.target_id) or guild.get_role(record.target_id)
+            if target is None:
+                continue  # role is gone and wasn't restored
+        else:
+            target = discord.Object(id=record.target_id, type=discord.Member)
+        overwrites[target] = discord.PermissionOverwrite.from_pair(
+            discord.Permissions(record.allow), discord.Permissions(record.deny)
+        )
+    return overwrites
+
+
+def _create_channel(guild, record, category, overwrites, reason):
+    """Coroutine factory recreating a channel of the record's type"""
+    kind = discord.ChannelType(record.kind)
+    common = {'position': record.position, 'overwrites': overwrites, 'reason': reason}
+    if kind is discord.ChannelType.category:
+        return lambda: guild.create_category(record.name, **common)
+    if kind in (discord.ChannelType.voice, discord.ChannelType.stage_voice):
+        create = guild.create_voice_channel if kind is discord.ChannelType.voice else guild.create_stage_channel
+        extra = {'user_limit': record.user_limit or 0}
+        if record.bitrate:
+            extra['bitrate'] = min(record.bitrate, int(guild.bitrate_limit))
+        return lambda: create(record.name, category=category, **common, **extra)
+    if kind is discord.ChannelType.forum:
+        return lambda: guild.create_forum(record.name, category=category, topic=record.topic or '',
+                                          nsfw=record.nsfw, slowmode_delay=record.slowmode_delay, **common)
+    return lambda: guild.create_text_channel(
+        record.name, category=category, news=kind is discord.ChannelType.news,
+        topic=record.topic or '', nsfw=record.nsfw, slowmode_delay=record.slowmode_delay, **common
+    )
+
+
+async def restore_guild(guild, channels, roles, concurrency=5, reason="Anti-nuke: restore"):
+    """Recreate deleted roles, then categories, then channels, each stage in parallel.
+
+    Returns (restored, failed) lists of (kind, old id, name, detail) tuples, where
+    detail is the new object's mention or the error message."""
+    restored, failed = [], []
+    role_map = {}  # {old role id: new Role}
+
+    def collect(kind, records, results, created=None):
+        for record, result in zip(records, results):
+            if isinstance(result, Exception):
+                failed.append((kind, record.id, record.name, str(result)))
+            else:
+                restored.append((kind, record.id, record.name, getattr(result, 'mention', '')))
+                if created is not None:
+                    created[record.id] = result
+
+    # 1. Roles, so channel overwrites can point at them
+    roles = sorted(roles, key=lambda r: r.position)
+    results = await gather_limited([
+        (lambda r=r: guild.create_role(
+            name=r.name, permissions=discord.Permissions(r.permissions), colour=r.colour,
+            hoist=r.hoist, mentionable=r.mentionable, reason=reason))
+        for r in roles
+    ], concurrency)
+    collect('role', roles, results, role_map)
+    positions = {role_map[r.id]: r.position for r in roles if r.id in role_map}
+    if positions:
+        try:
+            await guild.edit_role_positions(positions, reason=reason)
+        except discord.HTTPException as e:
+            failed.append(('role positions', None, '-', str(e)))
+
+    # 2. Categories, so channels can be placed back inside them
+    category_map = {}  # {old category id: new CategoryChannel}
+    categories = [c for c in channels if c.kind == discord.ChannelType.category.value]
+    results = await gather_limited([
+        _create_channel(guild, c, None, _build_overwrites(guild, c.overwrites, role_map), reason)
+        for c in categories
+    ], concurrency)
+    collect('category', categories, results, category_map)
+
+    # 3. Everything else
+    others = [c for c in channels if c.kind != discord.ChannelType.category.value]
+    factories = []
+    for record in others:
+        category = None
+        if record.category_id is not None:
+            category = category_map.get(record.category_id) or guild.get_channel(record.category_id)
+        overwrites = _build_overwrites(guild, record.overwrites, role_map)
+        factories.append(_create_channel(guild, record, category, overwrites, reason))
+    results = await gather_limited(factories, concurrency)
+    collect('channel', others, results)
+
+    return restored, failed
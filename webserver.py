@@ -1,4 +1,7 @@
-from flask import Flask
+import hmac
+import os
+
+from flask import Flask, jsonify, request
 from threading import Thread
 
 app = Flask('')
@@ -7,6 +10,26 @@ app = Flask('')
 def home():
     return "Discord bot ok"
 
+@app.route("/rest-profile")
+def rest_profile():
+    # REST call profile (only when the bot runs with REST_PROFILE=1). The server listens
+    # on every interface, so the report is only served to callers presenting REST_PROFILE_TOKEN
+    from rest_profiler import profiler
+    expected = os.getenv('REST_PROFILE_TOKEN', '')
+    if not expected:
+        return jsonify({"error": "Set REST_PROFILE_TOKEN to serve the REST profile over HTTP"}), 404
+    given = request.headers.get("X-Rest-Profile-Token") or request.args.get("token", "")
+    if not hmac.compare_digest(given.encode('utf-8'), expected.encode('utf-8')):
+        return jsonify({"error": "invalid or missing token"}), 403
+    if not profiler.enabled:
+        return jsonify({"error": "REST profiling is disabled (set REST_PROFILE=1)"}), 404
+    group = request.args.get("group")
+    limit = request.args.get("limit", type=int)
+    return jsonify({
+        "since": profiler.started,
+        "rows": profiler.report(group=group if group in ("source", "route") else None, limit=limit),
+    })
+
 def run():
     app.run(host="0.0.0.0", port=8080)
 